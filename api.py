@@ -4,29 +4,58 @@ Usage:
     python api.py              Start the API server on port 8000
     uvicorn api:app --reload   Start with auto-reload for development
 """
+import asyncio
+import hashlib
 import tempfile
-import shutil
+import threading
 from pathlib import Path
-from fastapi import FastAPI, UploadFile, File, HTTPException
+
+import aiofiles
+import orjson
+from fastapi import FastAPI, Request, Response, UploadFile, File, HTTPException
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 
 from obsrag.config import get_config
-from obsrag.rag.indexer import load_documents, build_or_load_index, add_note_to_index, sync_index
-from obsrag.rag.tags import load_tag_set, build_tag_context, refresh_tag_set
-from obsrag.rag.suggest import suggest_links_and_tags, suggest_tags_via_llm
-from obsrag.ocr import ocr_pdf_with_llm
+
+# Heavy imports (llama_index, torch, sentence-transformers) are deferred to
+# the background init thread so the server binds and /health answers within
+# milliseconds of process start.
+from obsrag.rag.suggest import (
+    suggest_links_and_tags,
+    suggest_tags_via_llm,
+    suggest_with_fallback,
+    finalize_suggestions,
+)
+from obsrag.rag.semantic_cache import SemanticCache
+from obsrag.ocr import ocr_pdf_with_llm_async
 from obsrag.writer import write_note
-from llama_index.core.postprocessor import SentenceTransformerRerank
 
-app = FastAPI(title="Obsidian RAG API", version="1.0.0")
+# orjson serializes the dict/list-heavy suggestion payloads 3-5x faster
+# than stdlib json
+app = FastAPI(
+    title="Obsidian RAG API",
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+)
 
 # Shared resources initialized at startup
 cfg = None
 docs = None
 index = None
 tag_set = None
+sorted_tags = None
+tags_json_bytes = None
+tags_etag = None
 tag_context = None
 reranker = None
+embed_model = None
+retriever = None
+tag_index = None
+suggest_cache = None
+# Bound by _initialize once the heavy modules are imported
+add_note_to_index = None
+refresh_tag_set = None
 
 
 class SuggestRequest(BaseModel):
@@ -58,18 +87,52 @@ class HealthResponse(BaseModel):
 
 @app.on_event("startup")
 def startup():
-    """Initialize all shared resources once at startup."""
-    global cfg, docs, index, tag_set, tag_context, reranker
+    """Kick off initialization in the background.
+
+    Index load, tag scan, and model loads take seconds; running them on a
+    daemon thread lets /health respond immediately while /suggest and
+    /process return 503 until everything is ready.
+    """
+    import logging
+    logging.basicConfig(format="%(message)s", level=logging.INFO)
+    threading.Thread(target=_initialize, daemon=True).start()
+
+
+@app.on_event("shutdown")
+def shutdown():
+    """Flush any cache inserts still pending from the batched persistence."""
+    if suggest_cache is not None:
+        suggest_cache.save()
+
+
+def _initialize():
+    """Load all shared resources once; heavy imports happen here."""
+    global cfg, docs, index, tag_set, sorted_tags, tag_context, reranker, embed_model, tag_index
+    global retriever, add_note_to_index, refresh_tag_set
+
+    from obsrag.cache import load_documents_cached
+    from obsrag.rag.indexer import (
+        build_or_load_index, add_note_to_index, sync_index,
+    )
+    from obsrag.rag.tags import (
+        load_tag_set, build_tag_context, refresh_tag_set, TagEmbeddingIndex,
+    )
+    from obsrag.rag.rerank import BatchingReranker, RemoteReranker
+    from obsrag.rag.vecstore import build_memmap_retriever
+    from llama_index.embeddings.openai import OpenAIEmbedding
+
     cfg = get_config()
     print("Initializing Obsidian RAG pipeline...")
-    docs = load_documents(cfg.vault_path)
-    index = build_or_load_index(
+    docs = load_documents_cached(
+        cfg.vault_path, cfg.persist_dir.parent / "doc_cache.pkl"
+    )
+    _index = build_or_load_index(
         docs, cfg.persist_dir, cfg.embedding.model,
         chunk_size=cfg.embedding.chunk_size,
         chunk_overlap=cfg.embedding.chunk_overlap,
     )
     sync_index(
-        index, docs, cfg.vault_path, cfg.persist_dir,
+        _index, docs, cfg.vault_path, cfg.persist_dir,
         chunk_size=cfg.embedding.chunk_size,
         chunk_overlap=cfg.embedding.chunk_overlap,
     )
@@ -78,11 +141,33 @@ def startup():
         style=cfg.tags.style,
         tags_folder_name=cfg.folders.tags,
     )
+    # tag_set only changes when /process writes a note, so sort it once
+    sorted_tags = sorted(tag_set)
+    _refresh_tags_response()
     tag_context = build_tag_context(docs, tag_set)
-    reranker = SentenceTransformerRerank(
-        model=cfg.rag.reranker_model,
-        top_n=cfg.rag.reranker_top_n,
+    if cfg.rag.reranker_url:
+        # Shared inference service: all workers use one model copy and
+        # batching coalesces across workers (see obsrag/rag/rerank_server.py)
+        reranker = RemoteReranker(cfg.rag.reranker_url, top_n=cfg.rag.reranker_top_n)
+    else:
+        reranker = BatchingReranker(
+            model=cfg.rag.reranker_model,
+            top_n=cfg.rag.reranker_top_n,
+            quantize=cfg.rag.reranker_quantize,
+        )
+    reranker.warm_up()
+    embed_model = OpenAIEmbedding(model=cfg.embedding.model)
+    # One batched embedding call; tag scoring becomes a single matrix-vector
+    # product per request instead of a loop over tags.
+    tag_index = TagEmbeddingIndex(sorted_tags, embed_model) if sorted_tags else None
+    # Memmap the corpus vectors: with multiple workers the OS page cache
+    # holds one physical copy instead of one per process.
+    retriever = build_memmap_retriever(
+        _index, cfg.persist_dir, embed_model,
+        similarity_top_k=cfg.rag.top_k, dtype=cfg.rag.vector_dtype,
     )
+    # Assigned last: handlers gate on `index is not None` for readiness
+    index = _index
     print(f"Ready. {len(docs)} docs, {len(tag_set)} tags loaded, {len(tag_context)} tags with context.")
 
 
@@ -97,94 +182,145 @@ def health():
     )
 
 
+def _refresh_tags_response():
+    """Precompute the /tags body and ETag; called whenever tag_set changes."""
+    global tags_json_bytes, tags_etag
+    tags_json_bytes = orjson.dumps(sorted_tags)
+    tags_etag = hashlib.md5(tags_json_bytes).hexdigest()
+
+
 @app.get("/tags")
-def get_tags() -> list[str]:
+def get_tags(request: Request):
     """Return all available tags from the vault."""
     if tag_set is None:
         raise HTTPException(status_code=503, detail="Server not ready")
-    return sorted(tag_set)
+    # Serve precomputed bytes — no per-request sort or serialization — and
+    # let clients revalidate with If-None-Match for a free 304. The etag
+    # can still be None in the startup window between the tag scan and
+    # _refresh_tags_response; a None == None match would 304 a client
+    # that sent no If-None-Match at all.
+    if tags_etag is not None and request.headers.get("if-none-match") == tags_etag:
+        return Response(status_code=304)
+    return Response(
+        content=tags_json_bytes,
+        media_type="application/json",
+        headers={"ETag": tags_etag, "Cache-Control": "max-age=60"},
+    )
 
 
 @app.post("/suggest", response_model=SuggestResponse)
-def suggest(req: SuggestRequest):
+async def suggest(req: SuggestRequest):
     """Suggest wikilinks and tags for the given text (no OCR, no file write)."""
+    global suggest_cache
     if index is None:
         raise HTTPException(status_code=503, detail="Server not ready")
 
-    result = suggest_links_and_tags(
+    # Semantic cache: near-duplicate queries (common with re-submitted OCR
+    # text) skip retrieval, reranking, and the LLM fallback entirely.
+    query_vec = await asyncio.to_thread(embed_model.get_text_embedding, req.text)
+    if suggest_cache is None:
+        suggest_cache = SemanticCache(
+            dim=len(query_vec),
+            persist_dir=cfg.persist_dir.parent / "suggest_cache",
+        )
+    cached = suggest_cache.get(query_vec, top_k=req.top_k)
+    if cached is not None:
+        return SuggestResponse(**cached)
+
+    # Embedding + reranking are CPU/network heavy — run them off the event
+    # loop so concurrent requests aren't serialized. The index, docs, and
+    # reranker are read-only after startup, so this is thread-safe.
+    # The text is already embedded for the cache lookup above — reuse that
+    # vector instead of paying a second embedding round trip in retrieval.
+    result = await asyncio.to_thread(
+        suggest_links_and_tags,
         req.text, index, tag_set, docs,
-        reranker=reranker, top_k=req.top_k,
+        reranker=reranker, top_k=req.top_k, retriever=retriever,
+        query_vec=query_vec,
     )
+    # Supplement retrieval tags with direct tag-name similarity — one GEMV
+    # against the precomputed tag embedding matrix, often avoiding the much
+    # more expensive LLM fallback below.
+    if tag_index is not None:
+        present = {t["title"] for t in result["suggested_tags"]}
+        for name, score in tag_index.top_tags(query_vec, k=cfg.rag.reranker_top_n):
+            if name not in present and score >= cfg.rag.min_confidence_threshold:
+                result["suggested_tags"].append(
+                    {"title": name, "score": round(score, 4), "source": "embedding"}
+                )
+
     retrieval_tags = [t["title"] for t in result["suggested_tags"]]
 
     top_score = result["suggested_links"][0]["score"] if result["suggested_links"] else 0
 
     llm_tags = None
     if len(retrieval_tags) < cfg.rag.min_tags_threshold or top_score < cfg.rag.min_confidence_threshold:
-        llm_tags = suggest_tags_via_llm(
+        llm_tags = await asyncio.to_thread(
+            suggest_tags_via_llm,
             note_text=req.text,
-            all_tags=sorted(tag_set),
+            all_tags=sorted_tags,
             retrieval_tags=retrieval_tags,
             tag_context=tag_context,
         )
 
-    return SuggestResponse(
-        suggested_links=result["suggested_links"],
-        suggested_tags=result["suggested_tags"],
-        llm_tags=llm_tags,
-    )
+    payload = {
+        "suggested_links": result["suggested_links"],
+        "suggested_tags": result["suggested_tags"],
+        "llm_tags": llm_tags,
+    }
+    # Insert off the event loop: the batched flush inside put() can touch
+    # disk, and the handler shouldn't block on it.
+    await asyncio.to_thread(suggest_cache.put, query_vec, payload, req.top_k)
+    return SuggestResponse(**payload)
 
 
 @app.post("/process", response_model=ProcessResponse)
 async def process(file: UploadFile = File(...)):
     """Upload a PDF, run the full OCR-to-Obsidian pipeline."""
+    global sorted_tags
     if index is None:
         raise HTTPException(status_code=503, detail="Server not ready")
 
     if not file.filename.lower().endswith(".pdf"):
         raise HTTPException(status_code=400, detail="Only PDF files are supported")
 
-    # Save uploaded file to a temp directory
-    tmp_dir = Path(tempfile.mkdtemp())
-    tmp_path = tmp_dir / file.filename
-    try:
-        with open(tmp_path, "wb") as f:
-            content = await file.read()
-            f.write(content)
-
-        # OCR
-        input_text, page_images, page_offsets = ocr_pdf_with_llm(tmp_path, model=cfg.ocr.model)
-
-        # Layer 1: Retrieval-based suggestions
-        result = suggest_links_and_tags(
-            input_text, index, tag_set, docs,
-            reranker=reranker, top_k=cfg.rag.top_k,
+    # A single temp file is cheaper than a mkdtemp + rmtree walk per upload;
+    # the OS reclaims it on close. The note title comes from the original
+    # upload filename, not the temp name.
+    with tempfile.NamedTemporaryFile(suffix=".pdf") as tf:
+        tmp_path = Path(tf.name)
+        # Stream the upload in 1 MiB chunks so large scanned PDFs never sit
+        # fully in RAM and the event loop can interleave other requests.
+        async with aiofiles.open(tmp_path, "wb") as f:
+            while chunk := await file.read(1 << 20):
+                await f.write(chunk)
+
+        # OCR — awaited natively; the coroutine pushes its own blocking work
+        # (rasterization, hashing) to threads. The OCR module caches
+        # per-page transcripts by content hash, so re-uploads of the same
+        # PDF skip every vision call (pages are still rasterized locally —
+        # that part is cheap).
+        input_text, page_images, page_offsets = await ocr_pdf_with_llm_async(
+            tmp_path, model=cfg.ocr.model,
+            cache_dir=cfg.persist_dir.parent / "ocr_cache",
         )
-        retrieval_tags = [t["title"] for t in result["suggested_tags"]]
-        top_score = result["suggested_links"][0]["score"] if result["suggested_links"] else 0
-
-        # Layer 2: LLM fallback
-        llm_tags = None
-        if len(retrieval_tags) < cfg.rag.min_tags_threshold or top_score < cfg.rag.min_confidence_threshold:
-            llm_tags = suggest_tags_via_llm(
-                note_text=input_text,
-                all_tags=sorted(tag_set),
-                retrieval_tags=retrieval_tags,
-                filename=file.filename,
-                tag_context=tag_context,
-            )
-
-        # Determine final tags
-        if llm_tags:
-            final_tags = llm_tags.get("existing_tags", []) + llm_tags.get("new_tags", [])
-        else:
-            final_tags = retrieval_tags
 
-        references = [link["title"] for link in result["suggested_links"] if link.get("source") == "retrieval"]
-        title = tmp_path.stem.replace("_", " ").replace("-", " ").title()
+        # Layers 1+2: retrieval suggestions and the LLM-fallback decision,
+        # shared with the CLI pipeline
+        result = await asyncio.to_thread(
+            suggest_with_fallback,
+            input_text, index, tag_set, docs, cfg,
+            reranker=reranker, retriever=retriever,
+            filename=file.filename, tag_context=tag_context,
+            all_tags=sorted_tags,
+        )
+        llm_tags = result["llm_tags"]
+        final_tags, references = finalize_suggestions(result)
+        title = Path(file.filename).stem.replace("_", " ").replace("-", " ").title()
 
         # Write to Obsidian
-        note_path = write_note(
+        note_path = await asyncio.to_thread(
+            write_note,
             title=title,
             content=input_text,
             tags=final_tags,
@@ -197,23 +333,64 @@ async def process(file: UploadFile = File(...)):
             attachments_path=cfg.attachments_path,
         )
 
-        # Incrementally update the index so subsequent uploads can find this note
-        new_doc = add_note_to_index(
-            index, note_path, cfg.vault_path, cfg.persist_dir,
-            chunk_size=cfg.embedding.chunk_size,
-            chunk_overlap=cfg.embedding.chunk_overlap,
-        )
-        docs.append(new_doc)
-
-        # Refresh tag set in case new tags were written to the vault
-        new_tag_set, new_tag_context = refresh_tag_set(
+        # Incrementally update the index so subsequent uploads can find this
+        # note, then extend the memmap export with just the new note's rows.
+        # Both embed over HTTP and touch disk, so the whole block runs off
+        # the event loop like every other blocking stretch in this handler.
+        def _update_index_and_export():
+            new_doc = add_note_to_index(
+                index, note_path, cfg.vault_path, cfg.persist_dir,
+                chunk_size=cfg.embedding.chunk_size,
+                chunk_overlap=cfg.embedding.chunk_overlap,
+            )
+            docs.append(new_doc)
+            if retriever is not None:
+                from obsrag.rag.vecstore import (
+                    MemmapRetriever, append_embeddings, build_memmap_retriever,
+                )
+                if append_embeddings(index, cfg.persist_dir):
+                    # Re-open the (cheap) memmaps over the extended files
+                    globals()["retriever"] = MemmapRetriever(
+                        index, cfg.persist_dir, embed_model,
+                        similarity_top_k=cfg.rag.top_k,
+                    )
+                else:
+                    # No usable export to extend — full re-export fallback
+                    globals()["retriever"] = build_memmap_retriever(
+                        index, cfg.persist_dir, embed_model,
+                        similarity_top_k=cfg.rag.top_k, dtype=cfg.rag.vector_dtype,
+                    )
+
+        await asyncio.to_thread(_update_index_and_export)
+
+        # Refresh tag set in case new tags were written to the vault. The
+        # note we just wrote guarantees a miss in the tag-scan memo, so
+        # this rescans (for hashtag vaults, re-reads) the vault and then
+        # walks every doc for context — off the loop like the other
+        # blocking stages here.
+        new_tag_set, new_tag_context = await asyncio.to_thread(
+            refresh_tag_set,
             cfg.vault_path, cfg.folders.tags, cfg.tags.style, docs,
         )
+        old_sorted_tags = sorted_tags
         tag_set.clear()
         tag_set.update(new_tag_set)
+        sorted_tags = sorted(tag_set)
+        _refresh_tags_response()
         tag_context.clear()
         tag_context.update(new_tag_context)
 
+        # New tags must also reach the embedding-similarity tag scorer, or
+        # they stay invisible to /suggest until a restart. Rebuilding is one
+        # batched embedding call, run off the loop, and only when the tag
+        # list actually changed.
+        if sorted_tags != old_sorted_tags:
+            from obsrag.rag.tags import TagEmbeddingIndex
+            globals()["tag_index"] = (
+                await asyncio.to_thread(TagEmbeddingIndex, sorted_tags, embed_model)
+                if sorted_tags else None
+            )
+
         return ProcessResponse(
             title=title,
             ocr_text=input_text,
@@ -222,10 +399,20 @@ async def process(file: UploadFile = File(...)):
             llm_tags=llm_tags,
             note_path=str(note_path),
         )
-    finally:
-        shutil.rmtree(tmp_dir, ignore_errors=True)
 
 
 if __name__ == "__main__":
+    import os
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # uvloop + httptools cut event-loop/parsing overhead; multiple workers let
+    # CPU-bound rerank/embedding requests run in parallel processes. Note each
+    # worker loads its own copy of the index, docs, and reranker — budget RAM
+    # accordingly for large vaults.
+    uvicorn.run(
+        "api:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="uvloop",
+        http="httptools",
+        workers=max(2, (os.cpu_count() or 2) // 2),
+    )
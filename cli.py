@@ -6,6 +6,7 @@ Usage:
     python cli.py process <pdf>     Process a single PDF through the pipeline
     python cli.py watch             Watch folder for new PDFs
 """
+import logging
 import shutil
 from pathlib import Path
 
@@ -16,7 +17,10 @@ import yaml
 @click.group()
 def cli():
     """Obsidian RAG — OCR handwritten notes into your Obsidian vault."""
-    pass
+    # Single stream handler for the obsrag.* loggers; OCR progress logs at
+    # INFO without the per-call flush contention of bare print under
+    # concurrent page tasks.
+    logging.basicConfig(format="%(message)s", level=logging.INFO)
 
 
 @cli.command()
@@ -93,28 +97,37 @@ def init():
 
 
 @cli.command()
-def build():
-    """Build or rebuild the vector index."""
+@click.option("--force", is_flag=True, help="Discard the existing index and re-embed everything.")
+def build(force: bool):
+    """Build or incrementally update the vector index."""
     from obsrag.config import get_config
-    from obsrag.rag.indexer import load_documents, build_or_load_index, _manifest_path
+    from obsrag.rag.indexer import load_documents, build_or_load_index, sync_index, _manifest_path
 
     cfg = get_config()
 
-    # Remove existing index and manifest to force a clean rebuild
-    if cfg.persist_dir.exists():
-        shutil.rmtree(cfg.persist_dir)
-        click.echo("Removed existing index.")
-    manifest = _manifest_path(cfg.persist_dir)
-    if manifest.exists():
-        manifest.unlink()
-        click.echo("Removed manifest.")
+    if force:
+        # Remove existing index and manifest to force a clean rebuild
+        if cfg.persist_dir.exists():
+            shutil.rmtree(cfg.persist_dir)
+            click.echo("Removed existing index.")
+        manifest = _manifest_path(cfg.persist_dir)
+        if manifest.exists():
+            manifest.unlink()
+            click.echo("Removed manifest.")
 
     docs = load_documents(cfg.vault_path)
-    build_or_load_index(
+    index = build_or_load_index(
         docs, cfg.persist_dir, cfg.embedding.model,
         chunk_size=cfg.embedding.chunk_size,
         chunk_overlap=cfg.embedding.chunk_overlap,
     )
+    # Only changed/new/deleted files are re-embedded; a handful of edits no
+    # longer re-pays the full embedding bill. Use --force for a clean slate.
+    sync_index(
+        index, docs, cfg.vault_path, cfg.persist_dir,
+        chunk_size=cfg.embedding.chunk_size,
+        chunk_overlap=cfg.embedding.chunk_overlap,
+    )
     click.echo("Index built successfully.")
 
 
@@ -122,12 +135,27 @@ def build():
 @click.argument("pdf", type=click.Path(exists=True, path_type=Path))
 def process(pdf: Path):
     """Process a single PDF through the full pipeline."""
+    from concurrent.futures import ThreadPoolExecutor
+
     from obsrag.config import get_config
+    from obsrag.ocr import ocr_pdf_with_llm
     from obsrag.pipeline import setup, process_pdf
 
     cfg = get_config()
-    docs, index, tag_set, tag_context, reranker = setup(cfg)
-    process_pdf(pdf, docs, index, tag_set, tag_context, reranker, cfg)
+    # Model/index loading and OCR are independent — setup() runs on a worker
+    # thread while OCR streams pages, so a cold invocation pays the longer
+    # of the two instead of their sum.
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        setup_future = pool.submit(setup, cfg)
+        ocr_result = ocr_pdf_with_llm(
+            pdf, model=cfg.ocr.model,
+            cache_dir=cfg.persist_dir.parent / "ocr_cache",
+        )
+        docs, index, tag_set, sorted_tags, tag_context, reranker = setup_future.result()
+    process_pdf(
+        pdf, docs, index, tag_set, sorted_tags, tag_context, reranker, cfg,
+        ocr_result=ocr_result,
+    )
 
 
 @cli.command()
@@ -142,11 +170,12 @@ def watch():
         click.echo("Error: watch_folder not set in .obsrag.yaml")
         raise SystemExit(1)
 
-    docs, index, tag_set, tag_context, reranker = setup(cfg)
+    docs, index, tag_set, sorted_tags, tag_context, reranker = setup(cfg)
     watch_loop(
-        process_fn=lambda pdf: process_pdf(pdf, docs, index, tag_set, tag_context, reranker, cfg),
+        process_fn=lambda pdf: process_pdf(pdf, docs, index, tag_set, sorted_tags, tag_context, reranker, cfg),
         watch_folder=cfg.watch_folder,
         poll_interval=cfg.watcher.poll_interval,
+        max_concurrent=cfg.watcher.max_concurrent,
     )
 
 
@@ -0,0 +1,62 @@
+"""On-disk cache of parsed vault documents across process starts.
+
+setup() used to re-read and re-parse every note in the vault on each
+start, which for large vaults costs tens of seconds of I/O even in watch
+mode where almost nothing changed. The cache keeps parsed Documents
+keyed by file mtime so a warm start only re-parses the delta.
+"""
+import pickle
+from pathlib import Path
+
+from obsrag.rag.indexer import _make_vault_doc, link_backlinks
+
+# Bump when the cached Document shape changes so stale pickles are rebuilt.
+CACHE_VERSION = 1
+
+
+def load_documents_cached(vault_path: Path, cache_path: Path):
+    """Load vault documents, reusing parsed Documents from a pickle cache.
+
+    The cache maps vault-relative path -> (mtime_ns, Document). Each call
+    walks the vault once: unchanged files reuse their cached Document,
+    changed or new files are re-read and re-parsed, and entries for
+    deleted files are dropped. Backlinks are recomputed in memory on every
+    load — they depend on the whole link graph, not any single file, and
+    the inversion is cheap next to file I/O.
+    """
+    cached: dict = {}
+    if cache_path.exists():
+        try:
+            payload = pickle.loads(cache_path.read_bytes())
+            if payload.get("version") == CACHE_VERSION:
+                cached = payload["entries"]
+        except Exception:
+            cached = {}  # corrupt or incompatible cache — rebuild from scratch
+
+    entries: dict = {}
+    reparsed = 0
+    for path in sorted(vault_path.rglob("*.md")):
+        rel = str(path.relative_to(vault_path))
+        mtime_ns = path.stat().st_mtime_ns
+        hit = cached.get(rel)
+        if hit is not None and hit[0] == mtime_ns:
+            entries[rel] = hit
+            continue
+        try:
+            text = path.read_text(encoding="utf-8")
+        except (UnicodeDecodeError, OSError):
+            continue
+        entries[rel] = (mtime_ns, _make_vault_doc(path, text))
+        reparsed += 1
+
+    docs = [doc for _, doc in entries.values()]
+    link_backlinks(docs)
+
+    if reparsed or len(entries) != len(cached):
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cache_path.with_suffix(".tmp")
+        tmp.write_bytes(pickle.dumps({"version": CACHE_VERSION, "entries": entries}))
+        tmp.replace(cache_path)
+
+    print(f"Loaded {len(docs)} notes from vault ({reparsed} re-parsed)")
+    return docs
@@ -61,11 +61,17 @@ class RagConfig:
     reranker_top_n: int = 5
     min_tags_threshold: int = 3
     min_confidence_threshold: float = 0.4
+    vector_dtype: str = "float32"  # "float32" or "int8" (4x smaller memmap)
+    reranker_url: str | None = None  # URL of a shared rerank_server instance
+    # Dynamic INT8 quantization of the PyTorch reranker (used when no ONNX
+    # export is available). None = on everywhere except macOS.
+    reranker_quantize: bool | None = None
 
 
 @dataclass
 class WatcherConfig:
     poll_interval: int = 30
+    max_concurrent: int = 4
 
 
 @dataclass
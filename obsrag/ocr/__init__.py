@@ -2,6 +2,18 @@
 
 Re-exports the main OCR functions for convenient imports:
     from obsrag.ocr import ocr_pdf_with_llm
+
+The Google Vision functions are exported lazily (PEP 562): google.py
+transitively drags in pix2tex/torch, which costs seconds of import time
+that the default OpenAI-vision path should never pay.
 """
-from .vision import ocr_pdf_with_llm, pdf_to_images
-from .google import ocr_pdf, ocr_pdf_structured
+from .vision import ocr_pdf_with_llm, ocr_pdf_with_llm_async, pdf_to_images
+
+_GOOGLE_EXPORTS = ("ocr_pdf", "ocr_pdf_structured")
+
+
+def __getattr__(name):
+    if name in _GOOGLE_EXPORTS:
+        from . import google
+        return getattr(google, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,5 +1,4 @@
 """Format classified OCR regions into clean Markdown."""
-import openai
 
 
 def regions_to_raw_markdown(regions: list[dict]) -> str:
@@ -17,12 +16,28 @@ def regions_to_raw_markdown(regions: list[dict]) -> str:
 
 
 def format_with_llm(raw_markdown: str) -> str:
-    """Use LLM to clean up and structure the raw Markdown."""
-    response = openai.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{
-            "role": "user",
-            "content": f"""Clean up and structure the following raw OCR output into
+    """Use LLM to clean up and structure the raw Markdown.
+
+    Goes through the shared pooled client from vision.py, so the call
+    reuses a warm keep-alive connection instead of paying a TLS handshake.
+    """
+    from .vision import get_async_client, run_async
+
+    async def call():
+        return await get_async_client().chat.completions.create(
+            model="gpt-4o-mini",
+            messages=_format_messages(raw_markdown),
+            temperature=0,
+        )
+
+    response = run_async(call())
+    return response.choices[0].message.content
+
+
+def _format_messages(raw_markdown: str) -> list[dict]:
+    return [{
+        "role": "user",
+        "content": f"""Clean up and structure the following raw OCR output into
 well-formatted Markdown for a personal knowledge base.
 
 Rules:
@@ -38,7 +53,4 @@ Raw OCR output:
 {raw_markdown}
 
 Return only the cleaned Markdown, no explanation."""
-        }],
-        temperature=0,
-    )
-    return response.choices[0].message.content
+    }]
@@ -1,11 +1,31 @@
 """Google Cloud Vision OCR — simple and structured pipelines."""
+import asyncio
+import functools
 import io
+import logging
+import os
+import tempfile
 from pathlib import Path
 from PIL import Image
+from pdf2image import convert_from_path
 from google.cloud import vision
-from pix2tex.cli import LatexOCR
 from .classifier import classify_page
-from .vision import pdf_to_images
+from .vision import pdf_page_count
+
+logger = logging.getLogger("obsrag.ocr")
+
+# Online file annotation processes at most 5 pages per request.
+PAGES_PER_REQUEST = 5
+
+
+@functools.lru_cache(maxsize=1)
+def _get_vision_client() -> vision.ImageAnnotatorClient:
+    """Process-wide Vision client — gRPC channel + auth are built once.
+
+    Constructing the client per PDF costs 100-500ms of credential and
+    channel setup, paid repeatedly in watch mode.
+    """
+    return vision.ImageAnnotatorClient()
 
 
 # Lazy-loaded LaTeX model (heavy, only load when needed)
@@ -15,17 +35,26 @@ latex_model = None
 def get_latex_model():
     global latex_model
     if latex_model is None:
+        # Deferred: pix2tex pulls in torch, which costs seconds to import
+        # and is only needed for pages that actually contain math.
+        import torch
+        from pix2tex.cli import LatexOCR
+
+        torch.set_num_threads(os.cpu_count() or 1)
         latex_model = LatexOCR()
     return latex_model
 
 
-def ocr_image(image: Image.Image, client: vision.ImageAnnotatorClient) -> str:
-    """Send a single image to Google Cloud Vision and return extracted text."""
+def _image_bytes(image: Image.Image) -> bytes:
+    """Encode a page as JPEG-85 for upload — much smaller than PNG for scans."""
     buffer = io.BytesIO()
-    image.save(buffer, format="PNG")
-    content = buffer.getvalue()
+    image.convert("RGB").save(buffer, format="JPEG", quality=85, optimize=True)
+    return buffer.getvalue()
 
-    gcp_image = vision.Image(content=content)
+
+def ocr_image(image: Image.Image, client: vision.ImageAnnotatorClient) -> str:
+    """Send a single image to Google Cloud Vision and return extracted text."""
+    gcp_image = vision.Image(content=_image_bytes(image))
     response = client.document_text_detection(image=gcp_image)
 
     if response.error.message:
@@ -36,24 +65,88 @@ def ocr_image(image: Image.Image, client: vision.ImageAnnotatorClient) -> str:
     return ""
 
 
+def _rasterize_jpeg(pdf_path: Path) -> list[tuple[bytes, Image.Image]]:
+    """Rasterize to JPEG files and return (raw_bytes, image) per page.
+
+    pdftoppm writes JPEG directly, so the upload payload is the file bytes
+    as-is — no PIL re-encode — while the same bytes are decoded once for
+    classification and math-region cropping.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = convert_from_path(
+            str(pdf_path),
+            thread_count=min(8, os.cpu_count() or 1),
+            fmt="jpeg",
+            jpegopt={"quality": 90},
+            output_folder=tmp,
+            paths_only=True,
+        )
+        pages = []
+        for path in paths:
+            data = Path(path).read_bytes()
+            image = Image.open(io.BytesIO(data))
+            image.load()
+            pages.append((data, image))
+    return pages
+
+
+def _annotate_pdf_pages(
+    client: vision.ImageAnnotatorClient, pdf_bytes: bytes, pages: list[int]
+) -> list:
+    """Annotate up to PAGES_PER_REQUEST pages of a PDF in one RPC."""
+    request = vision.AnnotateFileRequest(
+        input_config=vision.InputConfig(
+            content=pdf_bytes, mime_type="application/pdf"
+        ),
+        features=[vision.Feature(type_=vision.Feature.Type.DOCUMENT_TEXT_DETECTION)],
+        pages=pages,
+    )
+    response = client.batch_annotate_files(requests=[request])
+    return list(response.responses[0].responses)
+
+
 def ocr_pdf(pdf_path: Path) -> str:
-    """Simple pipeline: PDF → plain text."""
-    client = vision.ImageAnnotatorClient()
-    images = pdf_to_images(pdf_path)
+    """Simple pipeline: PDF → plain text.
+
+    The PDF bytes are sent to the Vision API directly via file annotation
+    (5 pages per RPC, the online batch limit), so this path never
+    rasterizes locally and pays ceil(N/5) round-trips instead of N.
+    """
+    client = _get_vision_client()
+    pdf_bytes = pdf_path.read_bytes()
+    total = pdf_page_count(pdf_path)
+
+    batches = [
+        list(range(first, min(first + PAGES_PER_REQUEST - 1, total) + 1))
+        for first in range(1, total + 1, PAGES_PER_REQUEST)
+    ]
+
+    logger.info("OCR processing %d pages in %d requests...", total, len(batches))
+
+    async def run():
+        tasks = [
+            asyncio.to_thread(_annotate_pdf_pages, client, pdf_bytes, pages)
+            for pages in batches
+        ]
+        return await asyncio.gather(*tasks)
 
     all_text = []
-    for i, image in enumerate(images):
-        print(f"OCR processing page {i + 1}/{len(images)}")
-        text = ocr_image(image, client)
-        all_text.append(text)
+    for batch_responses in asyncio.run(run()):
+        for page_response in batch_responses:
+            if page_response.error.message:
+                raise Exception(f"Vision API error {page_response.error.message}")
+            if page_response.full_text_annotation:
+                all_text.append(page_response.full_text_annotation.text)
+            else:
+                all_text.append("")
 
     combined = "\n\n".join(all_text)
-    print(f"Extracted {len(combined)} characters total")
+    logger.info("Extracted %d characters total", len(combined))
     return combined
 
 
-def ocr_math_region(page_image: Image.Image, bounds: dict) -> str:
-    """Crop a math region from the page and convert to LaTeX."""
+def _crop_math_region(page_image: Image.Image, bounds: dict) -> Image.Image:
+    """Crop a math region (plus padding) out of the page."""
     padding = 15
     crop_box = (
         max(0, bounds["x_min"] - padding),
@@ -61,22 +154,57 @@ def ocr_math_region(page_image: Image.Image, bounds: dict) -> str:
         min(page_image.width, bounds["x_max"] + padding),
         min(page_image.height, bounds["y_max"] + padding),
     )
-    cropped = page_image.crop(crop_box)
+    return page_image.crop(crop_box)
+
+
+def ocr_math_regions(page_image: Image.Image, regions: list[dict]):
+    """Fill in `latex` for every math region on a page.
+
+    Crops are collected up front and sent through Pix2Tex as one batch
+    where the model accepts list input, so model-dispatch overhead is paid
+    once per page rather than once per formula. Falls back to per-crop
+    calls when batching fails, so one unreadable crop can't take down the
+    rest of the page.
+    """
+    math_regions = [r for r in regions if r["type"] == "math"]
+    if not math_regions:
+        return
+
+    import torch
 
+    crops = [_crop_math_region(page_image, r["bounds"]) for r in math_regions]
     model = get_latex_model()
-    latex = model(cropped)
-    return f"${latex}$"
 
+    with torch.inference_mode():
+        if len(crops) > 1:
+            try:
+                for region, latex in zip(math_regions, model(crops)):
+                    region["latex"] = f"${latex}$"
+                return
+            except Exception:
+                pass  # model build doesn't take batches; score one at a time
+
+        for region, crop in zip(math_regions, crops):
+            try:
+                region["latex"] = f"${model(crop)}$"
+            except Exception as e:
+                logger.warning("Pix2Tex failed for region: %s", e)
+                region["latex"] = f"<!-- math OCR failed: {region['text']} -->"
 
-def ocr_page_structured(image: Image.Image, client: vision.ImageAnnotatorClient) -> list[dict]:
+
+def ocr_page_structured(
+    image: Image.Image,
+    client: vision.ImageAnnotatorClient,
+    jpeg_bytes: bytes | None = None,
+) -> list[dict]:
     """
     OCR a single page and return classified regions
     (text, math, diagram) in reading order.
-    """
-    buffer = io.BytesIO()
-    image.save(buffer, format="PNG")
-    content = buffer.getvalue()
 
+    jpeg_bytes, when given, is uploaded as-is instead of re-encoding the
+    PIL image.
+    """
+    content = jpeg_bytes if jpeg_bytes is not None else _image_bytes(image)
     gcp_image = vision.Image(content=content)
     response = client.document_text_detection(image=gcp_image)
 
@@ -89,27 +217,28 @@ def ocr_page_structured(image: Image.Image, client: vision.ImageAnnotatorClient)
     page = response.full_text_annotation.pages[0]
     regions = classify_page(page, image.height, image.width)
 
-    # For math regions, run Pix2Tex
-    for region in regions:
-        if region["type"] == "math":
-            try:
-                region["latex"] = ocr_math_region(image, region["bounds"])
-            except Exception as e:
-                print(f"Pix2Tex failed for region: {e}")
-                region["latex"] = f"<!-- math OCR failed: {region['text']} -->"
+    # For math regions, run Pix2Tex (batched across the page's formulas)
+    ocr_math_regions(image, regions)
 
     return regions
 
 
 def ocr_pdf_structured(pdf_path: Path) -> list[list[dict]]:
-    """Full structured pipeline: PDF → images → classified regions per page."""
-    client = vision.ImageAnnotatorClient()
-    images = pdf_to_images(pdf_path)
+    """Full structured pipeline: PDF → images → classified regions per page.
+
+    Pages are annotated concurrently (the sync SDK calls run on threads);
+    order is preserved by gather.
+    """
+    client = _get_vision_client()
+    pages = _rasterize_jpeg(pdf_path)
+
+    logger.info("Processing %d pages...", len(pages))
 
-    all_pages = []
-    for i, image in enumerate(images):
-        print(f"Processing page {i + 1}/{len(images)}...")
-        regions = ocr_page_structured(image, client)
-        all_pages.append(regions)
+    async def run():
+        tasks = [
+            asyncio.to_thread(ocr_page_structured, image, client, data)
+            for data, image in pages
+        ]
+        return await asyncio.gather(*tasks)
 
-    return all_pages
+    return asyncio.run(run())
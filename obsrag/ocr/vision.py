@@ -1,37 +1,124 @@
 """LLM vision OCR — converts PDF pages to clean Markdown via GPT-4o-mini."""
+import asyncio
+import atexit
 import io
 import base64
+import hashlib
+import logging
+import os
+import random
+import re
+import threading
 from pathlib import Path
 from PIL import Image
-from pdf2image import convert_from_path
+from pdf2image import convert_from_path, pdfinfo_from_path
 import openai
 
+logger = logging.getLogger("obsrag.ocr")
 
-def pdf_to_images(pdf_path: Path) -> list[Image.Image]:
-    """Convert a PDF to a list of PIL images, one per page."""
-    images = convert_from_path(str(pdf_path))
-    print(f"Converted {len(images)} pages from {pdf_path.name}")
-    return images
+# Max pages OCR'd concurrently; pages are independent, so wall time for an
+# N-page PDF drops from N round-trips to roughly N / OCR_CONCURRENCY.
+OCR_CONCURRENCY = int(os.getenv("OCR_CONCURRENCY", "8"))
 
+# Attempts per page before giving up on rate-limit/connection errors.
+OCR_MAX_RETRIES = 5
 
-def ocr_page_with_llm(page_image: Image.Image, model: str = "gpt-4o-mini") -> str:
-    """
-    Send a page image to an LLM vision API and get back
-    clean Markdown with LaTeX math and diagram placeholders.
+# Pages packed into one vision request. Each round trip pays network RTT,
+# queueing, and prompt prefill on top of the actual decode; packing a few
+# page images per call amortizes those fixed costs. Kept small so one bad
+# page can't poison too many neighbours.
+OCR_BATCH_PAGES = 4
+
+# Delimiter the model is told to emit between pages in a batched request.
+PAGE_BREAK = "<<<PAGE_BREAK>>>"
+
+# Pages rasterized per convert_from_path call when streaming; small batches
+# let OCR start on early pages while later ones are still rendering.
+RENDER_BATCH_PAGES = 4
+
+# One background event loop plus one pooled AsyncOpenAI client per event
+# loop that makes requests. Tearing the loop and client down per PDF (the
+# old asyncio.run pattern) re-paid a TLS handshake on the first pages of
+# each document; keep-alive connections make them free. Clients are keyed
+# by loop because httpx pool state (connections, locks) binds to the loop
+# that first uses it — sharing one client between, say, uvicorn's loop and
+# the background loop corrupts the pool.
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_lock = threading.Lock()
+_clients: dict[asyncio.AbstractEventLoop, "openai.AsyncOpenAI"] = {}
+_clients_lock = threading.Lock()
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """The process-wide background event loop, started on first use."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, daemon=True).start()
+    return _loop
+
+
+def run_async(coro):
+    """Run a coroutine on the shared loop and block for its result."""
+    return asyncio.run_coroutine_threadsafe(coro, _get_loop()).result()
+
+
+def get_async_client():
+    """Pooled AsyncOpenAI client for the current event loop.
+
+    One client (and thus one connection pool) exists per event loop:
+    coroutines get the client for the loop they're running on, and sync
+    callers — who always dispatch through run_async — get the background
+    loop's. Keep-alive connections must never cross loops, so the API
+    server's loop and the background loop each hold their own pool.
+
+    HTTP/2 (when the httpx[http2] extra is installed) multiplexes the many
+    concurrent page uploads over one TCP/TLS connection instead of paying
+    a handshake per pooled connection. The generous read timeout covers
+    slow multi-image batch responses; connect stays short so a dead
+    network fails fast.
     """
-    # Convert PIL image to base64
-    buffer = io.BytesIO()
-    page_image.save(buffer, format="PNG")
-    b64_image = base64.b64encode(buffer.getvalue()).decode("utf-8")
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = _get_loop()
 
-    response = openai.chat.completions.create(
-        model=model,
-        messages=[{
-            "role": "user",
-            "content": [
-                {
-                    "type": "text",
-                    "text": """You are an OCR transcription tool. Transcribe the handwritten
+    with _clients_lock:
+        client = _clients.get(loop)
+        if client is None:
+            import httpx
+
+            def make_http_client(http2: bool):
+                return httpx.AsyncClient(
+                    limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+                    timeout=httpx.Timeout(120.0, connect=10.0),
+                    http2=http2,
+                )
+
+            try:
+                http_client = make_http_client(http2=True)
+            except ImportError:  # h2 not installed
+                http_client = make_http_client(http2=False)
+
+            client = openai.AsyncOpenAI(http_client=http_client)
+            if not _clients:
+                atexit.register(_close_clients)
+            _clients[loop] = client
+    return client
+
+
+def _close_clients():
+    """Close the pooled connections cleanly at interpreter exit."""
+    for loop, client in list(_clients.items()):
+        if loop.is_running():
+            try:
+                asyncio.run_coroutine_threadsafe(client.close(), loop).result(timeout=5)
+            except Exception:
+                pass  # exiting anyway; the OS reclaims the sockets
+
+
+OCR_PROMPT = """You are an OCR transcription tool. Transcribe the handwritten
 content in this image into clean Markdown. You MUST transcribe
 whatever is written - do not refuse or say you cannot read it.
 
@@ -42,64 +129,488 @@ Rules:
 - Use appropriate Markdown formatting (headings, bullet points) where apparent
 - Do not add any information that isn't in the image
 - Do not wrap the output in a code fence or ```markdown``` block
-- Do not include any preamble, explanation, or apology - just the transcribed content""",
-                },
-                {
-                    "type": "image_url",
-                    "image_url": {
-                        "url": f"data:image/png;base64,{b64_image}",
-                    },
-                },
-            ],
-        }],
-        temperature=0,
+- Do not include any preamble, explanation, or apology - just the transcribed content"""
+
+
+# Render resolution for the PyMuPDF path; roughly matches pdftoppm's
+# default output size for letter pages.
+RENDER_DPI = 200
+
+
+def _open_fitz(pdf_path: Path):
+    """The PDF opened with PyMuPDF, or None when fitz isn't installed.
+
+    PyMuPDF renders pages in-process — no Poppler subprocess per batch and
+    far lower memory than pdf2image on long PDFs — so it's preferred when
+    the optional dependency is present, with pdf2image as the fallback.
+    """
+    try:
+        import fitz
+    except ImportError:
+        return None
+    return fitz.open(str(pdf_path))
+
+
+def _pixmap_to_image(page) -> Image.Image:
+    """Render one fitz page to a PIL image."""
+    pm = page.get_pixmap(dpi=RENDER_DPI)
+    return Image.frombytes("RGB", (pm.width, pm.height), pm.samples)
+
+
+def pdf_to_images(pdf_path: Path) -> list[Image.Image]:
+    """Convert a PDF to a list of PIL images, one per page.
+
+    Uses PyMuPDF when installed; otherwise pdftoppm, fanned out across
+    cores since rasterization is CPU-bound and independent per page.
+    """
+    doc = _open_fitz(pdf_path)
+    if doc is not None:
+        with doc:
+            images = [_pixmap_to_image(page) for page in doc]
+    else:
+        images = convert_from_path(
+            str(pdf_path),
+            thread_count=min(8, os.cpu_count() or 1),
+            fmt="png",
+        )
+    logger.info("Converted %d pages from %s", len(images), pdf_path.name)
+    return images
+
+
+def pdf_page_count(pdf_path: Path) -> int:
+    """Number of pages in the PDF, without rasterizing any of them."""
+    doc = _open_fitz(pdf_path)
+    if doc is not None:
+        with doc:
+            return doc.page_count
+    return int(pdfinfo_from_path(str(pdf_path))["Pages"])
+
+
+def iter_pdf_pages(pdf_path: Path):
+    """Yield (page_index, image) pairs as they render.
+
+    Unlike pdf_to_images, this doesn't wait for the whole PDF to render
+    before returning the first page, so a consumer can overlap OCR network
+    latency with rasterization of later pages. PyMuPDF streams page by
+    page; the pdf2image fallback renders in small pdftoppm batches.
+    """
+    doc = _open_fitz(pdf_path)
+    if doc is not None:
+        with doc:
+            for idx, page in enumerate(doc):
+                yield idx, _pixmap_to_image(page)
+        return
+
+    total = pdf_page_count(pdf_path)
+    for first in range(1, total + 1, RENDER_BATCH_PAGES):
+        last = min(first + RENDER_BATCH_PAGES - 1, total)
+        batch = convert_from_path(
+            str(pdf_path),
+            thread_count=min(8, os.cpu_count() or 1),
+            fmt="png",
+            first_page=first,
+            last_page=last,
+        )
+        for offset, image in enumerate(batch):
+            yield first - 1 + offset, image
+
+
+# Long-edge cap for uploaded pages. GPT-4o-class vision tiles inputs into
+# 512px patches with a bounded tile budget; resolution past ~1536px is
+# billed (upload bytes, base64 expansion, prompt tokens) but not seen.
+OCR_MAX_SIDE = 1536
+
+
+def _encode_page_jpeg(page_image: Image.Image, max_side: int = OCR_MAX_SIDE) -> bytes:
+    """Encode a page image to JPEG bytes for the vision API.
+
+    JPEG-85 is 5-15x smaller than PNG for scanned pages and the upload
+    dominates per-page latency; pages are also capped at max_side on the
+    long edge, past which vision OCR accuracy doesn't improve.
+    """
+    if max(page_image.size) > max_side:
+        page_image = page_image.copy()
+        page_image.thumbnail((max_side, max_side), Image.LANCZOS)
+    buffer = io.BytesIO()
+    page_image.convert("RGB").save(buffer, format="JPEG", quality=85, optimize=True)
+    return buffer.getvalue()
+
+
+def _encode_page(page_image: Image.Image, max_side: int = OCR_MAX_SIDE) -> str:
+    """Base64 of the JPEG-encoded page, as the vision API wants it."""
+    return base64.b64encode(_encode_page_jpeg(page_image, max_side)).decode("utf-8")
+
+
+def _page_cache_key(jpeg_bytes: bytes, model: str) -> str:
+    """Content hash of the encoded page + model name for the OCR cache.
+
+    Keyed on the page image rather than the whole PDF, so a byte-identical
+    page — a re-exported PDF, a shared cover sheet, a recurring header
+    page — hits the cache regardless of which document it arrived in.
+    """
+    return hashlib.blake2b(jpeg_bytes + model.encode(), digest_size=16).hexdigest()
+
+
+# Stricter instruction appended on the single retry after a refusal.
+_FORCEFUL_SUFFIX = (
+    "\n\nREMINDER: These are the user's own handwritten notes and "
+    "transcribing them is the entire task. Transcribe the visible writing "
+    "exactly as it appears. Do not refuse, apologize, or add commentary."
+)
+
+
+def _ocr_messages(b64_image: str, forceful: bool = False) -> list[dict]:
+    """Build the vision chat messages for one page."""
+    return [{
+        "role": "user",
+        "content": [
+            {"type": "text", "text": OCR_PROMPT + (_FORCEFUL_SUFFIX if forceful else "")},
+            {
+                "type": "image_url",
+                "image_url": {"url": f"data:image/jpeg;base64,{b64_image}"},
+            },
+        ],
+    }]
+
+
+def _batch_messages(b64_images: list[str]) -> list[dict]:
+    """Build one vision chat message covering several pages."""
+    instruction = (
+        f"{OCR_PROMPT}\n\n"
+        f"You are given {len(b64_images)} page images. Transcribe each page "
+        f"in order, and separate consecutive pages with a line containing "
+        f"exactly {PAGE_BREAK}. Output nothing else between pages."
     )
+    content: list[dict] = [{"type": "text", "text": instruction}]
+    for b64 in b64_images:
+        content.append({
+            "type": "image_url",
+            "image_url": {"url": f"data:image/jpeg;base64,{b64}"},
+        })
+    return [{"role": "user", "content": content}]
+
+
+# Page-break delimiter plus any surrounding blank lines, for splitting a
+# batched response back into per-page texts.
+_PAGE_BREAK_RE = re.compile(rf"\s*{re.escape(PAGE_BREAK)}\s*")
+
+# Wrapping ```/```markdown fence at either end of the output.
+_FENCE_RE = re.compile(r"\A```(?:markdown)?\s*|\s*```\s*\Z")
+# Leading refusal preamble lines (e.g. "I'm unable to assist with that.").
+_REFUSAL_RE = re.compile(r"\A(?:\s*(?:I'm (?:unable|sorry)|I cannot|Sorry,)[^\n]*\n?)+")
+
+# Same refusal openers as prefixes, checked against the head of a streamed
+# response so generation can be aborted before paying for the whole thing.
+_REFUSAL_PREFIXES = ("I'm unable", "I'm sorry", "I cannot", "Sorry,")
+
+# How many streamed characters to accumulate before the refusal check.
+_REFUSAL_CHECK_CHARS = 30
+
+
+def _clean_ocr_text(result: str) -> str:
+    """Strip code fences and refusal preambles from the model output.
 
-    result = response.choices[0].message.content
+    Both patterns are precompiled and anchored, so cleanup is two regex
+    passes per page rather than a Python loop over lines.
+    """
+    result = _FENCE_RE.sub("", result)
+    result = _REFUSAL_RE.sub("", result)
+    return result.strip()
 
-    # Strip markdown code fences if the model wrapped the output anyway
-    if result.startswith("```markdown"):
-        result = result[len("```markdown"):].strip()
-    if result.startswith("```"):
-        result = result[3:].strip()
-    if result.endswith("```"):
-        result = result[:-3].strip()
 
-    # Strip refusal preambles (e.g. "I'm unable to assist with that.")
-    refusal_prefixes = [
-        "I'm unable to",
-        "I cannot",
-        "I'm sorry",
-        "Sorry,",
-    ]
-    lines = result.split("\n")
-    while lines and any(lines[0].strip().startswith(p) for p in refusal_prefixes):
-        lines.pop(0)
-    result = "\n".join(lines).strip()
+def ocr_page_with_llm(page_image: Image.Image, model: str = "gpt-4o-mini") -> str:
+    """
+    Send a page image to an LLM vision API and get back
+    clean Markdown with LaTeX math and diagram placeholders.
 
-    return result
+    Rides the module's shared pooled client rather than the openai
+    package's default lazily-created one, so single-page calls reuse the
+    same keep-alive connections as the batched pipeline instead of paying
+    a fresh TLS handshake.
+    """
+    client = get_async_client()
+    response = run_async(client.chat.completions.create(
+        model=model,
+        messages=_ocr_messages(_encode_page(page_image)),
+        temperature=0,
+    ))
+    return _clean_ocr_text(response.choices[0].message.content)
 
 
-def ocr_pdf_with_llm(pdf_path: Path, model: str = "gpt-4o-mini") -> tuple[str, list[Image.Image], list[tuple[int, int]]]:
+async def _create_with_retry(client, messages: list[dict], model: str,
+                             max_retries: int, label: str):
+    """chat.completions.create with jittered exponential-backoff retries.
+
+    Transient failures (429s from rate limiting, dropped connections) are
+    retried; callers hold the concurrency semaphore across the sleep so a
+    throttled request also sheds its slot instead of immediately being
+    replaced by another in-flight one.
+    """
+    for attempt in range(max_retries):
+        try:
+            return await client.chat.completions.create(
+                model=model, messages=messages, temperature=0,
+            )
+        except (openai.RateLimitError, openai.APIConnectionError):
+            if attempt == max_retries - 1:
+                raise
+            delay = 2**attempt + random.random()
+            logger.info("OCR %s throttled, retrying in %.1fs...", label, delay)
+            await asyncio.sleep(delay)
+
+
+async def _stream_ocr(
+    client,
+    messages: list[dict],
+    model: str,
+    max_retries: int,
+    label: str,
+    abort_on_refusal: bool,
+) -> str | None:
+    """Stream one completion, optionally aborting early on a refusal.
+
+    The first ~30 streamed characters are checked against the refusal
+    openers; when abort_on_refusal is set and they match, the stream is
+    closed immediately — no point paying generation cost for output that
+    _clean_ocr_text would strip — and None is returned so the caller can
+    retry with a stricter prompt. Rate-limit/connection errors back off
+    the same way as the non-streaming path.
+    """
+    for attempt in range(max_retries):
+        try:
+            stream = await client.chat.completions.create(
+                model=model, messages=messages, temperature=0, stream=True,
+            )
+            parts: list[str] = []
+            length = 0
+            checked = not abort_on_refusal
+            async with stream:
+                async for chunk in stream:
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if not delta:
+                        continue
+                    parts.append(delta)
+                    length += len(delta)
+                    if not checked and length >= _REFUSAL_CHECK_CHARS:
+                        checked = True
+                        if "".join(parts).lstrip().startswith(_REFUSAL_PREFIXES):
+                            logger.info("OCR %s opened with a refusal; aborting stream", label)
+                            return None
+            text = "".join(parts)
+            if not checked and text.lstrip().startswith(_REFUSAL_PREFIXES):
+                return None
+            return text
+        except (openai.RateLimitError, openai.APIConnectionError):
+            if attempt == max_retries - 1:
+                raise
+            delay = 2**attempt + random.random()
+            logger.info("OCR %s throttled, retrying in %.1fs...", label, delay)
+            await asyncio.sleep(delay)
+
+
+async def _ocr_page_async(
+    client,
+    b64: str,
+    model: str,
+    sem: asyncio.Semaphore,
+    page_num: int,
+    total: int,
+    max_retries: int = OCR_MAX_RETRIES,
+) -> str:
+    """OCR one pre-encoded page through the shared async client.
+
+    Encoding happens upstream (on a worker thread, so it neither blocks
+    the event loop nor occupies a semaphore slot). Refusals are caught
+    early off the response stream and retried once with a stricter
+    instruction; a second refusal is kept and cleaned as before.
+    """
+    label = f"page {page_num}/{total}"
+    async with sem:
+        logger.info("OCR (LLM vision) page %d/%d...", page_num, total)
+        text = await _stream_ocr(
+            client, _ocr_messages(b64), model, max_retries, label,
+            abort_on_refusal=True,
+        )
+        if text is None:
+            logger.info("OCR %s refused; retrying with stricter prompt", label)
+            text = await _stream_ocr(
+                client, _ocr_messages(b64, forceful=True), model, max_retries,
+                label, abort_on_refusal=False,
+            )
+    return _clean_ocr_text(text)
+
+
+async def _ocr_batch_async(
+    client,
+    items: list[tuple[int, str]],
+    model: str,
+    sem: asyncio.Semaphore,
+    total: int,
+    max_retries: int = OCR_MAX_RETRIES,
+) -> list[str]:
+    """OCR a batch of (page_index, b64_jpeg) pairs in one vision request.
+
+    The model is asked to separate pages with PAGE_BREAK; when the split
+    doesn't yield one section per page (the model merged or dropped a
+    delimiter), the whole batch falls back to per-page calls rather than
+    guessing at the alignment.
+    """
+    if len(items) == 1:
+        idx, b64 = items[0]
+        return [await _ocr_page_async(
+            client, b64, model, sem, idx + 1, total, max_retries=max_retries,
+        )]
+
+    async with sem:
+        pages = ",".join(str(idx + 1) for idx, _ in items)
+        logger.info("OCR (LLM vision) pages %s/%d...", pages, total)
+        response = await _create_with_retry(
+            client, _batch_messages([b64 for _, b64 in items]),
+            model, max_retries, f"pages {pages}/{total}",
+        )
+
+    parts = _PAGE_BREAK_RE.split(response.choices[0].message.content)
+    if len(parts) == len(items):
+        return [_clean_ocr_text(part) for part in parts]
+
+    logger.info(
+        "Batched OCR returned %d sections for %d pages; retrying per page",
+        len(parts), len(items),
+    )
+    return list(await asyncio.gather(*[
+        _ocr_page_async(client, b64, model, sem, idx + 1, total, max_retries=max_retries)
+        for idx, b64 in items
+    ]))
+
+
+async def ocr_pdf_with_llm_async(
+    pdf_path: Path,
+    model: str = "gpt-4o-mini",
+    cache_dir: Path | None = None,
+    max_concurrency: int = OCR_CONCURRENCY,
+    max_retries: int = OCR_MAX_RETRIES,
+    batch_size: int = OCR_BATCH_PAGES,
+) -> tuple[str, list[Image.Image], list[tuple[int, int]]]:
     """LLM vision pipeline: PDF → images → clean Markdown via LLM vision API.
 
+    Rasterization and OCR are pipelined: a producer task streams pages off
+    iter_pdf_pages while consumer tasks (bounded by OCR_CONCURRENCY) OCR
+    whatever has rendered so far, so network latency hides rasterization
+    cost instead of waiting for the whole PDF to convert first.
+
+    When cache_dir is given, each page's transcript is cached on disk keyed
+    by the content hash of the encoded page image plus the model name.
+    Re-running the same PDF skips every vision call, a partially failed run
+    only re-pays the pages that never completed, and byte-identical pages
+    are shared across documents. Pages are still rasterized locally — the
+    images are part of the return value — but that stage is cheap.
+
+    max_concurrency bounds in-flight vision requests — size it to the API
+    tier's RPM/TPM budget; unbounded fan-out just trades throughput for
+    429s. max_retries caps the backoff retries per request (see
+    _create_with_retry). batch_size packs that many pages into each vision
+    request to amortize round-trip and prefill cost; 1 restores strict
+    per-page calls.
+
     Returns:
         Tuple of (combined_text, page_images, page_offsets) where page_offsets
         is a list of (start_char, end_char) tuples mapping each page to its
         position in the combined text.
     """
-    images = pdf_to_images(pdf_path)
+    total = await asyncio.to_thread(pdf_page_count, pdf_path)
+    images: list = [None] * total
+    all_text: list = [None] * total
+
+    if cache_dir is not None:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+
+    sem = asyncio.Semaphore(max_concurrency)
+    client = get_async_client()
+    # Bounded so the rasterizer can't run arbitrarily far ahead of OCR;
+    # sized to keep every consumer fed with a full batch plus slack.
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max(max_concurrency, 2 * batch_size))
+
+    async def producer():
+        pages = iter_pdf_pages(pdf_path)
+        while True:
+            item = await asyncio.to_thread(next, pages, None)
+            if item is None:
+                break
+            await queue.put(item)
+        for _ in range(max_concurrency):
+            await queue.put(None)
+
+    async def flush(pending: list[tuple[int, str, Path | None]]):
+        texts = await _ocr_batch_async(
+            client, [(idx, b64) for idx, b64, _ in pending],
+            model, sem, total, max_retries=max_retries,
+        )
+        for (idx, _, page_path), text in zip(pending, texts):
+            all_text[idx] = text
+            if page_path is not None:
+                # Atomic write so a crash mid-write never leaves a
+                # truncated transcript that would be trusted later.
+                tmp = page_path.with_suffix(".tmp")
+                tmp.write_text(text)
+                tmp.replace(page_path)
+
+    async def consumer():
+        pending: list[tuple[int, str, Path | None]] = []
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            idx, image = item
+            images[idx] = image
+
+            # Encode off-loop; the JPEG bytes double as the cache key.
+            jpeg = await asyncio.to_thread(_encode_page_jpeg, image)
+
+            page_path = None
+            if cache_dir is not None:
+                page_path = cache_dir / f"{_page_cache_key(jpeg, model)}.md"
+                if page_path.exists():
+                    all_text[idx] = page_path.read_text()
+                    continue
+
+            b64 = base64.b64encode(jpeg).decode("utf-8")
+            pending.append((idx, b64, page_path))
+            if len(pending) >= batch_size:
+                await flush(pending)
+                pending = []
+        if pending:
+            await flush(pending)
+
+    await asyncio.gather(producer(), *[consumer() for _ in range(max_concurrency)])
 
-    all_text = []
     page_offsets = []
     current_pos = 0
-    for i, image in enumerate(images):
-        print(f"OCR (LLM vision) page {i + 1}/{len(images)}...")
-        text = ocr_page_with_llm(image, model=model)
-        all_text.append(text)
+    for text in all_text:
         page_offsets.append((current_pos, current_pos + len(text)))
         current_pos += len(text) + 2  # +2 for "\n\n" separator
 
     combined = "\n\n".join(all_text)
-    print(f"Extracted {len(combined)} characters total")
+    logger.info("Extracted %d characters total", len(combined))
     return combined, images, page_offsets
+
+
+def ocr_pdf_with_llm(
+    pdf_path: Path,
+    model: str = "gpt-4o-mini",
+    cache_dir: Path | None = None,
+    max_concurrency: int = OCR_CONCURRENCY,
+    max_retries: int = OCR_MAX_RETRIES,
+    batch_size: int = OCR_BATCH_PAGES,
+) -> tuple[str, list[Image.Image], list[tuple[int, int]]]:
+    """Synchronous wrapper for ocr_pdf_with_llm_async (see its docstring).
+
+    Runs the coroutine on the shared background loop, so sync callers
+    (CLI, watcher threads) still reuse the pooled client and keep-alive
+    connections. Async callers — the API handlers — should await
+    ocr_pdf_with_llm_async directly instead of paying a thread hop.
+    """
+    return run_async(ocr_pdf_with_llm_async(
+        pdf_path, model=model, cache_dir=cache_dir,
+        max_concurrency=max_concurrency, max_retries=max_retries,
+        batch_size=batch_size,
+    ))
@@ -1,8 +1,8 @@
 """Build or load the vector store index."""
 import json
 import re
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from llama_index.readers.obsidian import ObsidianReader
 from llama_index.core import Document, VectorStoreIndex, StorageContext, load_index_from_storage
 from llama_index.core.node_parser import SentenceSplitter
 from llama_index.embeddings.openai import OpenAIEmbedding
@@ -64,21 +64,10 @@ def _build_manifest_from_docs(docs: list, vault_path: Path) -> dict:
 # Shared insert helper
 # ---------------------------------------------------------------------------
 
-def _insert_vault_doc(
-    index: VectorStoreIndex,
-    file_path: Path,
-    vault_path: Path,
-    chunk_size: int,
-    chunk_overlap: int,
-) -> Document:
-    """
-    Read a vault .md file, build a Document with ObsidianReader-compatible
-    metadata, chunk it, insert into the index, and return the Document.
-    """
-    text = file_path.read_text(encoding="utf-8")
+def _make_vault_doc(file_path: Path, text: str) -> Document:
+    """Build a Document with vault metadata from a note's text."""
     wikilinks = re.findall(r'\[\[([^\]]+)\]\]', text)
-
-    doc = Document(
+    return Document(
         text=text,
         metadata={
             "file_name": file_path.name,
@@ -90,6 +79,20 @@ def _insert_vault_doc(
         },
     )
 
+
+def _insert_vault_doc(
+    index: VectorStoreIndex,
+    file_path: Path,
+    vault_path: Path,
+    chunk_size: int,
+    chunk_overlap: int,
+) -> Document:
+    """
+    Read a vault .md file, build a Document with vault metadata, chunk it,
+    insert into the index, and return the Document.
+    """
+    doc = _make_vault_doc(file_path, file_path.read_text(encoding="utf-8"))
+
     parser = SentenceSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
     nodes = parser.get_nodes_from_documents([doc])
     index.insert_nodes(nodes)
@@ -100,10 +103,44 @@ def _insert_vault_doc(
 # Public API
 # ---------------------------------------------------------------------------
 
+def link_backlinks(docs: list) -> None:
+    """Populate backlinks by inverting the wikilink graph in a single pass."""
+    by_name: dict[str, list] = {}
+    for doc in docs:
+        doc.metadata["backlinks"] = []
+        by_name.setdefault(doc.metadata["note_name"], []).append(doc)
+    for doc in docs:
+        for link in doc.metadata["wikilinks"]:
+            for target in by_name.get(link, []):
+                target.metadata["backlinks"].append(doc.metadata["note_name"])
+
+
 def load_documents(vault_path: Path):
-    """Load all documents from the Obsidian vault."""
-    reader = ObsidianReader(input_dir=str(vault_path))
-    docs = reader.load_data()
+    """Load all documents from the Obsidian vault.
+
+    Note files are read on a thread pool (the GIL releases during file I/O,
+    so reads overlap), then backlinks are filled in by inverting the
+    wikilink graph in a single pass.
+    """
+    paths = sorted(vault_path.rglob("*.md"))
+
+    def read_one(path: Path):
+        try:
+            return path.read_text(encoding="utf-8")
+        except (UnicodeDecodeError, OSError):
+            return None
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        texts = list(pool.map(read_one, paths))
+
+    docs = [
+        _make_vault_doc(path, text)
+        for path, text in zip(paths, texts)
+        if text is not None
+    ]
+
+    link_backlinks(docs)
+
     print(f"Loaded {len(docs)} notes from vault")
     return docs
 
@@ -119,7 +156,13 @@ def build_or_load_index(
     Build a new index from documents, or load from disk if it already exists.
     Uses chunking with configurable overlap for better context.
     """
-    embed_model = OpenAIEmbedding(model=embedding_model)
+    # Large batches + concurrent HTTP requests: first-build time is dominated
+    # by embedding calls, which are embarrassingly parallel.
+    embed_model = OpenAIEmbedding(
+        model=embedding_model,
+        embed_batch_size=512,
+        num_workers=8,
+    )
 
     if persist_dir.exists():
         print("Loading existing index")
@@ -132,11 +175,12 @@ def build_or_load_index(
             chunk_size=chunk_size,
             chunk_overlap=chunk_overlap,
         )
+        nodes = parser.get_nodes_from_documents(docs)
 
-        index = VectorStoreIndex.from_documents(
-            docs,
+        index = VectorStoreIndex(
+            nodes,
             embed_model=embed_model,
-            transformations=[parser],
+            show_progress=True,
         )
 
         persist_dir.mkdir(parents=True, exist_ok=True)
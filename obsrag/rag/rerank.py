@@ -0,0 +1,179 @@
+"""Cross-encoder reranking with micro-batching across concurrent requests.
+
+Under concurrent /suggest load each request used to make its own small
+cross-encoder forward pass, leaving the CPU badly under-utilized. The
+BatchingReranker coalesces query-document pairs from all in-flight requests
+into one predict() call, amortizing the transformer forward pass.
+"""
+import os
+import queue
+import sys
+import threading
+from concurrent.futures import Future
+
+# Drain up to this many query-doc pairs into one forward pass.
+MAX_BATCH_PAIRS = 32
+# How long to wait for more pairs to arrive before running a partial batch.
+MAX_WAIT_SECONDS = 0.005
+
+
+def load_cross_encoder(model_name: str, quantize: bool | None = None):
+    """Load the cross-encoder, preferring an INT8 ONNX export when available.
+
+    The quantized ONNX runtime path is typically 2-4x faster than FP32
+    PyTorch on CPU with negligible recall loss. Requires the optional
+    onnx/onnxruntime extras. When those (or a quantized export for the
+    model) are missing, falls back to PyTorch with dynamic INT8
+    quantization of the Linear layers — roughly half the latency and a
+    quarter of the weight memory of FP32. quantize=None enables that
+    fallback quantization everywhere except macOS, whose AVX-only CPUs
+    see little benefit; set rag.reranker_quantize to force it either way.
+
+    sentence_transformers is imported here rather than at module top so
+    that importing obsrag.pipeline (or RemoteReranker-only deployments)
+    doesn't pay the torch import.
+    """
+    import torch
+    from sentence_transformers import CrossEncoder
+
+    # Let the MiniLM matmuls fan out across all cores; the default can be
+    # conservative under some launchers.
+    torch.set_num_threads(os.cpu_count() or 1)
+
+    try:
+        return CrossEncoder(
+            model_name,
+            backend="onnx",
+            model_kwargs={"file_name": "onnx/model_qint8_avx512_vnni.onnx"},
+        )
+    except Exception:
+        pass
+
+    model = CrossEncoder(model_name)
+    if quantize is None:
+        quantize = sys.platform != "darwin"
+    if quantize:
+        model.model = torch.quantization.quantize_dynamic(
+            model.model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+    return model
+
+
+class BatchScorer:
+    """Micro-batching front-end for a cross-encoder.
+
+    score_pairs() can be called from any thread; pairs are pushed onto a
+    shared queue and a single background thread scores them in coalesced
+    batches. Used both in-process (BatchingReranker) and by the standalone
+    rerank service (rerank_server), where it additionally coalesces pairs
+    arriving from different API workers.
+    """
+
+    def __init__(self, model: str, quantize: bool | None = None):
+        self._model = load_cross_encoder(model, quantize=quantize)
+        self._queue: queue.Queue = queue.Queue()
+        self._worker = threading.Thread(target=self._drain_loop, daemon=True)
+        self._worker.start()
+
+    def warm_up(self):
+        """Run one dummy pair through the model so the first real request
+        doesn't pay tokenizer/weight cold-start cost."""
+        self._model.predict([("warm up", "warm up")])
+
+    def score_pairs(self, pairs: list[tuple[str, str]]) -> list[float]:
+        """Score (query, doc) pairs, coalescing with other in-flight calls."""
+        future: Future = Future()
+        self._queue.put((pairs, future))
+        return future.result()
+
+    def _drain_loop(self):
+        """Collect pairs from concurrent callers and score them in one pass."""
+        import torch
+
+        while True:
+            batch = [self._queue.get()]
+            total = len(batch[0][0])
+
+            # Coalesce: wait briefly for more requests before running
+            deadline = threading.TIMEOUT_MAX if total >= MAX_BATCH_PAIRS else MAX_WAIT_SECONDS
+            while total < MAX_BATCH_PAIRS:
+                try:
+                    item = self._queue.get(timeout=deadline)
+                except queue.Empty:
+                    break
+                batch.append(item)
+                total += len(item[0])
+
+            flat_pairs = [pair for pairs, _ in batch for pair in pairs]
+            try:
+                # inference_mode skips autograd bookkeeping entirely
+                # (a no-op for the ONNX backend, cheap either way).
+                with torch.inference_mode():
+                    all_scores = self._model.predict(flat_pairs, batch_size=MAX_BATCH_PAIRS)
+            except Exception as exc:
+                for _, future in batch:
+                    future.set_exception(exc)
+                continue
+
+            # Scatter scores back to each request's future
+            offset = 0
+            for pairs, future in batch:
+                future.set_result([float(s) for s in all_scores[offset : offset + len(pairs)]])
+                offset += len(pairs)
+
+
+def _apply_scores(nodes, scores, top_n: int):
+    """Assign new scores and return the top_n best nodes."""
+    for node, score in zip(nodes, scores):
+        node.score = float(score)
+    return sorted(nodes, key=lambda n: n.score, reverse=True)[:top_n]
+
+
+class BatchingReranker:
+    """Drop-in replacement for SentenceTransformerRerank with micro-batching."""
+
+    def __init__(self, model: str, top_n: int = 5, quantize: bool | None = None):
+        self.top_n = top_n
+        self._scorer = BatchScorer(model, quantize=quantize)
+
+    def warm_up(self):
+        self._scorer.warm_up()
+
+    def postprocess_nodes(self, nodes, query_str: str):
+        """Rerank nodes against the query, returning the top_n best."""
+        if not nodes:
+            return nodes
+        pairs = [(query_str, node.get_content()) for node in nodes]
+        return _apply_scores(nodes, self._scorer.score_pairs(pairs), self.top_n)
+
+
+class RemoteReranker:
+    """Reranker client for a shared rerank_server instance.
+
+    With several uvicorn workers, an in-process model means N model copies
+    and N torch thread pools contending for the same cores. Pointing
+    rag.reranker_url at one rerank_server gives every worker the same model
+    copy and lets batching coalesce across workers.
+    """
+
+    def __init__(self, url: str, top_n: int = 5):
+        import httpx
+
+        self.top_n = top_n
+        self._url = url.rstrip("/") + "/rerank"
+        self._client = httpx.Client(timeout=30.0)
+
+    def warm_up(self):
+        try:
+            self._client.post(self._url, json={"query": "warm up", "docs": ["warm up"]})
+        except Exception:
+            pass  # service may still be starting; first real call retries
+
+    def postprocess_nodes(self, nodes, query_str: str):
+        """Rerank nodes against the query via the shared service."""
+        if not nodes:
+            return nodes
+        docs = [node.get_content() for node in nodes]
+        response = self._client.post(self._url, json={"query": query_str, "docs": docs})
+        response.raise_for_status()
+        return _apply_scores(nodes, response.json()["scores"], self.top_n)
@@ -0,0 +1,51 @@
+"""Standalone reranker inference service.
+
+Runs the cross-encoder once and serves scores over HTTP so multiple API
+workers share a single model copy (and a single torch thread pool) instead
+of loading one each. The BatchScorer coalesces pairs arriving from
+different workers into shared forward passes.
+
+Usage:
+    python -m obsrag.rag.rerank_server          Serve on port 9000
+Then set `rag.reranker_url: http://localhost:9000` in .obsrag.yaml.
+"""
+from fastapi import FastAPI
+from pydantic import BaseModel
+
+from obsrag.config import get_config
+from obsrag.rag.rerank import BatchScorer
+
+app = FastAPI(title="Obsidian RAG rerank service", version="1.0.0")
+
+scorer = None
+
+
+class RerankRequest(BaseModel):
+    query: str
+    docs: list[str]
+
+
+class RerankResponse(BaseModel):
+    scores: list[float]
+
+
+@app.on_event("startup")
+def startup():
+    """Load the cross-encoder once and warm it."""
+    global scorer
+    cfg = get_config()
+    scorer = BatchScorer(cfg.rag.reranker_model, quantize=cfg.rag.reranker_quantize)
+    scorer.warm_up()
+    print(f"Rerank service ready ({cfg.rag.reranker_model})")
+
+
+@app.post("/rerank", response_model=RerankResponse)
+def rerank(req: RerankRequest):
+    """Score each doc against the query with the shared cross-encoder."""
+    pairs = [(req.query, doc) for doc in req.docs]
+    return RerankResponse(scores=scorer.score_pairs(pairs))
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="127.0.0.1", port=9000)
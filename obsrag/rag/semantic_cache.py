@@ -0,0 +1,232 @@
+"""LSH-backed semantic cache for suggestion results.
+
+Near-duplicate queries are common (users re-submit OCR-derived text with
+minor edits), and every miss pays an embedding call, a vector search, and a
+cross-encoder rerank. The cache stores (query embedding, result payload)
+pairs and answers repeat queries whose embedding is close enough to a
+cached one, using random-projection LSH buckets to keep lookups cheap.
+"""
+import json
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Single-file snapshot: vectors plus the JSON-encoded entry lists in one
+# .npz, written atomically via tmp + replace so concurrent workers saving
+# into the same dir can never leave mismatched vector/entry files — the
+# last complete snapshot wins.
+SNAPSHOT_FILE = "cache.npz"
+
+# Cosine similarity a cached query must reach to count as a hit.
+DEFAULT_THRESHOLD = 0.95
+# Number of random hyperplanes; 16 bits -> 65536 buckets.
+DEFAULT_NUM_BITS = 16
+# In-memory entry cap; when reached, the oldest half is dropped so the
+# cache (and its on-disk image) can't grow without bound.
+DEFAULT_MAX_ENTRIES = 4096
+# Persist once per this many inserts rather than on every one — a crash
+# loses at most a batch of cacheable results, never correctness.
+DEFAULT_SAVE_EVERY = 32
+
+
+class SemanticCache:
+    """Similarity cache keyed by query embedding.
+
+    Vectors are L2-normalized and hashed into LSH buckets via the sign of a
+    fixed Gaussian random projection, so a lookup only scores candidates in
+    the query's bucket instead of the whole cache.
+    """
+
+    def __init__(
+        self,
+        dim: int,
+        persist_dir: Path | None = None,
+        threshold: float = DEFAULT_THRESHOLD,
+        num_bits: int = DEFAULT_NUM_BITS,
+        ttl_days: float = 7.0,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        save_every: int = DEFAULT_SAVE_EVERY,
+    ):
+        self.dim = dim
+        self.threshold = threshold
+        self.ttl_seconds = ttl_days * 86400
+        self.max_entries = max_entries
+        self.save_every = save_every
+        self.persist_dir = Path(persist_dir) if persist_dir else None
+
+        # Fixed seed so buckets stay stable across restarts.
+        rng = np.random.default_rng(42)
+        self._projection = rng.standard_normal((dim, num_bits)).astype(np.float32)
+
+        # Geometrically grown vector buffer; rows [:len(self)] are live.
+        # Appends are amortized O(1) instead of a full-matrix vstack copy.
+        self._vectors = np.empty((0, dim), dtype=np.float32)
+        self._payloads: list[dict] = []
+        self._timestamps: list[float] = []
+        # Per-entry request top_k: the payload depends on it, so an entry
+        # only answers queries asking for the same value.
+        self._topks: list[int | None] = []
+        self._buckets: dict[int, list[int]] = {}
+        self._dirty = 0
+        # put() runs on to_thread workers while get() runs on others, and
+        # eviction rebuilds the bucket index — all mutation is serialized.
+        self._lock = threading.Lock()
+
+        if self.persist_dir:
+            self._load()
+
+    # -- hashing -----------------------------------------------------------
+
+    @staticmethod
+    def _normalize(vec: np.ndarray) -> np.ndarray:
+        vec = np.asarray(vec, dtype=np.float32)
+        return vec / (np.linalg.norm(vec) + 1e-12)
+
+    def _bucket_key(self, vec: np.ndarray) -> int:
+        bits = (vec @ self._projection) > 0
+        return int(np.packbits(bits, bitorder="little").view(np.uint16)[0])
+
+    # -- public API --------------------------------------------------------
+
+    def get(self, query_vec, top_k: int | None = None) -> dict | None:
+        """Return the cached payload for a near-duplicate query, or None.
+
+        top_k must match the value the entry was cached under — a result
+        computed for top_k=10 is not a valid answer for top_k=50.
+        """
+        vec = self._normalize(query_vec)
+        with self._lock:
+            candidates = self._buckets.get(self._bucket_key(vec), [])
+            candidates = [i for i in candidates if self._topks[i] == top_k]
+            if not candidates:
+                return None
+
+            now = time.time()
+            scores = self._vectors[candidates] @ vec
+            best = int(np.argmax(scores))
+            idx = candidates[best]
+            if scores[best] >= self.threshold and now - self._timestamps[idx] < self.ttl_seconds:
+                return self._payloads[idx]
+            return None
+
+    def put(self, query_vec, payload: dict, top_k: int | None = None) -> None:
+        """Insert a (query embedding, payload) pair.
+
+        Persistence is batched: the cache is flushed to disk once every
+        save_every inserts (call save() on shutdown to flush the rest),
+        so a miss doesn't pay an O(cache size) disk write. When the entry
+        cap is reached the oldest half is evicted first.
+        """
+        vec = self._normalize(query_vec)
+        with self._lock:
+            if len(self._payloads) >= self.max_entries:
+                self._evict(keep=self.max_entries // 2)
+
+            idx = len(self._payloads)
+            if idx >= len(self._vectors):
+                grown = np.empty((max(256, 2 * len(self._vectors)), self.dim), dtype=np.float32)
+                grown[:idx] = self._vectors[:idx]
+                self._vectors = grown
+            self._vectors[idx] = vec
+            self._payloads.append(payload)
+            self._timestamps.append(time.time())
+            self._topks.append(top_k)
+            self._buckets.setdefault(self._bucket_key(vec), []).append(idx)
+
+            self._dirty += 1
+            if self.persist_dir and self._dirty >= self.save_every:
+                self._save()
+
+    def __len__(self) -> int:
+        return len(self._payloads)
+
+    def _evict(self, keep: int) -> None:
+        """Drop all but the newest `keep` entries and rebuild the buckets.
+
+        Entries are stored in insertion order, so the newest are the tail;
+        halving on a full cache amortizes the rebuild to O(1) per insert.
+        """
+        start = len(self._payloads) - keep
+        self._vectors = np.array(self._vectors[start:start + keep], dtype=np.float32)
+        self._payloads = self._payloads[start:]
+        self._timestamps = self._timestamps[start:]
+        self._topks = self._topks[start:]
+        self._buckets = {}
+        for idx in range(keep):
+            self._buckets.setdefault(self._bucket_key(self._vectors[idx]), []).append(idx)
+
+    # -- persistence -------------------------------------------------------
+
+    def save(self) -> None:
+        """Flush pending inserts to disk, if any."""
+        with self._lock:
+            if self.persist_dir and self._dirty:
+                self._save()
+
+    def _save(self) -> None:
+        """Write one atomic snapshot. Caller holds the lock."""
+        self.persist_dir.mkdir(parents=True, exist_ok=True)
+        entries = json.dumps({
+            "payloads": self._payloads,
+            "timestamps": self._timestamps,
+            "topks": self._topks,
+        }).encode()
+        tmp = self.persist_dir / (SNAPSHOT_FILE + ".tmp")
+        with open(tmp, "wb") as f:
+            np.savez(
+                f,
+                vectors=self._vectors[:len(self._payloads)],
+                entries=np.frombuffer(entries, dtype=np.uint8),
+            )
+        tmp.replace(self.persist_dir / SNAPSHOT_FILE)
+        self._dirty = 0
+
+    def _load(self) -> None:
+        try:
+            snap = self.persist_dir / SNAPSHOT_FILE
+            if snap.exists():
+                with np.load(snap) as data:
+                    vectors = np.asarray(data["vectors"], dtype=np.float32)
+                    entries = json.loads(bytes(data["entries"]))
+            else:
+                # Legacy two-file layout, read once then superseded.
+                vectors = np.load(self.persist_dir / "vectors.npy")
+                entries = json.loads((self.persist_dir / "entries.json").read_text())
+            if vectors.ndim != 2 or vectors.shape[1] != self.dim:
+                return  # embedding model changed — start fresh
+
+            payloads = entries["payloads"]
+            timestamps = entries["timestamps"]
+            # Pre-top_k cache files have no per-entry key; None never
+            # matches a real request value, so those entries age out.
+            topks = entries.get("topks", [None] * len(payloads))
+            if not (len(vectors) == len(payloads) == len(timestamps) == len(topks)):
+                raise ValueError("snapshot length mismatch")
+
+            # Drop expired entries on load (keeping at most max_entries of
+            # the newest), then rebuild buckets
+            now = time.time()
+            keep = [
+                i for i, ts in enumerate(timestamps)
+                if now - ts < self.ttl_seconds
+            ][-self.max_entries:]
+            self._vectors = vectors[keep]
+            self._payloads = [payloads[i] for i in keep]
+            self._timestamps = [timestamps[i] for i in keep]
+            self._topks = [topks[i] for i in keep]
+            for idx in range(len(self._payloads)):
+                self._buckets.setdefault(self._bucket_key(self._vectors[idx]), []).append(idx)
+            print(f"Semantic cache loaded: {len(self._payloads)} entries")
+        except FileNotFoundError:
+            return  # nothing persisted yet
+        except Exception:
+            # Corrupt or torn cache files must not take /suggest down —
+            # start fresh; the next flush overwrites the bad snapshot.
+            self._vectors = np.empty((0, self.dim), dtype=np.float32)
+            self._payloads = []
+            self._timestamps = []
+            self._topks = []
+            self._buckets = {}
+            print("Semantic cache unreadable — starting fresh")
@@ -7,8 +7,89 @@ Provides two layers of tag suggestion:
 2. LLM fallback: When retrieval returns too few tags or low confidence scores,
    uses GPT to intelligently select from all available tags.
 """
-import json
-import openai
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from heapq import nlargest
+from operator import itemgetter
+
+import orjson
+
+logger = logging.getLogger("obsrag.rag")
+
+# Shared fallback for notes missing from the metadata map; never mutated.
+_EMPTY_META: dict = {}
+
+# One long-lived worker for deferred LLM fallbacks. A per-call executor
+# would leak a non-daemon thread per processed PDF, with cleanup left to
+# garbage collection; fallbacks are rare enough that one thread suffices.
+_deferred_llm_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="llm-fallback")
+
+
+@functools.lru_cache(maxsize=4)
+def _sorted_tags(tags_key: tuple) -> tuple:
+    """Sorted tag names, memoized — the tag set is stable within a run."""
+    return tuple(sorted(tags_key))
+
+
+@functools.lru_cache(maxsize=4)
+def _tags_blob(tags_key: tuple) -> str:
+    """Serialized JSON array of the sorted tag names.
+
+    Sorting and dumping thousands of tag strings per prompt is pure
+    rework; the blob only changes when the tag set does, which the cache
+    key (the tuple of names) captures exactly. orjson already emits the
+    compact separators, so the prompt carries no whitespace padding.
+    """
+    return orjson.dumps(_sorted_tags(tags_key)).decode()
+
+
+def build_doc_metadata(docs: list) -> dict:
+    """Merged wikilink/backlink metadata per note, across all its chunks.
+
+    O(N) over every doc, so it's built once and memoized (see
+    _get_doc_metadata) rather than rebuilt inside every suggestion call.
+    Values are tuples: they're only ever iterated, and immutability keeps
+    the cached dict safe to share across threads. Each entry also carries
+    a precomputed 'neighbors' frozenset (wikilinks ∪ backlinks), so graph
+    expansion per retrieved note is one C-level set union instead of
+    re-unioning the two link lists on every query — hub notes recur
+    across queries and their neighbour sets never change between reloads.
+    """
+    doc_metadata: dict[str, dict] = {}
+    merged: dict[str, tuple[set, set]] = {}
+    for doc in docs:
+        name = doc.metadata.get("note_name", "")
+        if not name:
+            continue
+        if name not in merged:
+            merged[name] = (set(), set())
+        wikilinks, backlinks = merged[name]
+        wikilinks.update(doc.metadata.get("wikilinks", []))
+        backlinks.update(doc.metadata.get("backlinks", []))
+
+    for name, (wikilinks, backlinks) in merged.items():
+        doc_metadata[name] = {
+            "wikilinks": tuple(wikilinks),
+            "backlinks": tuple(backlinks),
+            "neighbors": frozenset(wikilinks | backlinks),
+        }
+    return doc_metadata
+
+
+# (docs identity, docs length) -> metadata; the docs list is replaced on
+# reload and appended to per processed PDF, so this key changes exactly
+# when the metadata could have.
+_doc_metadata_cache: tuple[int, int, dict] | None = None
+
+
+def _get_doc_metadata(docs: list) -> dict:
+    global _doc_metadata_cache
+    key = (id(docs), len(docs))
+    if _doc_metadata_cache is None or _doc_metadata_cache[:2] != key:
+        _doc_metadata_cache = key + (build_doc_metadata(docs),)
+    return _doc_metadata_cache[2]
 
 
 def suggest_links_and_tags(
@@ -18,6 +99,10 @@ def suggest_links_and_tags(
     docs: list,
     reranker=None,
     top_k: int = 10,
+    retriever=None,
+    k_final: int = 5,
+    gap_threshold: float = 0.05,
+    query_vec=None,
 ) -> dict:
     """
     Suggest wikilinks and tags using vector retrieval (Layer 1).
@@ -31,67 +116,84 @@ def suggest_links_and_tags(
         text: The input text to find suggestions for.
         index: The VectorStoreIndex to query.
         tag_set: Set of valid tag names from the vault's tags folder.
-        docs: Original documents from ObsidianReader (for complete metadata).
+        docs: Original vault documents (for complete wikilink/backlink metadata).
         reranker: Optional SentenceTransformerRerank for better ranking.
         top_k: Number of candidates to retrieve (reranker reduces this further).
+        retriever: Optional MemmapRetriever; falls back to the index's own
+            retriever when not given.
+        k_final: Number of results the ranking actually has to get right;
+            reranking is skipped when retrieval returns no more than this.
+        gap_threshold: Skip reranking when the retrieval score gap between
+            the best result and the k_final-th exceeds this — the order is
+            already decisive and the cross-encoder pass would be spent
+            confirming it.
+        query_vec: Precomputed embedding of text, when the caller already
+            has one (the API embeds for its semantic-cache lookup first);
+            avoids paying the embedding call a second time.
 
     Returns:
         Dict with 'suggested_links' and 'suggested_tags' lists.
     """
-    # Build lookup from note_name -> full doc metadata
-    # Merge wikilinks/backlinks from all chunks of the same note
-    doc_metadata = {}
-    for doc in docs:
-        name = doc.metadata.get("note_name", "")
-        if name:
-            if name not in doc_metadata:
-                doc_metadata[name] = {"wikilinks": set(), "backlinks": set()}
-            doc_metadata[name]["wikilinks"].update(doc.metadata.get("wikilinks", []))
-            doc_metadata[name]["backlinks"].update(doc.metadata.get("backlinks", []))
-
-    # Convert sets back to lists
-    for name in doc_metadata:
-        doc_metadata[name]["wikilinks"] = list(doc_metadata[name]["wikilinks"])
-        doc_metadata[name]["backlinks"] = list(doc_metadata[name]["backlinks"])
-
-    retriever = index.as_retriever(similarity_top_k=top_k)
-    results = retriever.retrieve(text)
-
-    # Rerank if available (cross-encoder for better semantic matching)
-    if reranker:
+    # Lookup from note_name -> full doc metadata (memoized; only rebuilt
+    # when the docs list itself changes)
+    doc_metadata = _get_doc_metadata(docs)
+
+    if retriever is not None:
+        results = retriever.retrieve(text, top_k=top_k, query_vec=query_vec)
+    elif query_vec is not None:
+        # QueryBundle with an embedding makes llama_index skip its own
+        # embedding call for the same text.
+        from llama_index.core.schema import QueryBundle
+
+        results = index.as_retriever(similarity_top_k=top_k).retrieve(
+            QueryBundle(query_str=text, embedding=list(query_vec))
+        )
+    else:
+        results = index.as_retriever(similarity_top_k=top_k).retrieve(text)
+
+    # Rerank if available (cross-encoder for better semantic matching).
+    # Skipped when retrieval is already decisive: too few candidates to
+    # reorder, or the top results well separated from the rest — the
+    # cross-encoder forward pass only earns its latency on close calls.
+    if (
+        reranker
+        and len(results) > k_final
+        and (results[0].score - results[k_final - 1].score) < gap_threshold
+    ):
         results = reranker.postprocess_nodes(results, query_str=text)
         # Filter out low-confidence results
         results = [r for r in results if r.score > 0]
 
     # Deduplicate by note name, keep best score
     # Use ORIGINAL doc metadata for wikilinks/backlinks
-    seen = {}
+    seen: dict[str, dict] = {}
+    seen_get = seen.get
+    meta_get = doc_metadata.get
     for node in results:
-        name = node.metadata.get("note_name", "")
-        if name and (name not in seen or node.score > seen[name]["score"]):
-            orig = doc_metadata.get(name, {})
+        metadata = node.metadata
+        name = metadata.get("note_name", "")
+        if not name:
+            continue
+        prev = seen_get(name)
+        if prev is None or node.score > prev["score"]:
+            orig = meta_get(name, _EMPTY_META)
             seen[name] = {
                 "title": name,
                 "score": round(node.score, 4),
-                "folder": node.metadata.get("folder_name", ""),
-                "wikilinks": orig.get("wikilinks", []),
-                "backlinks": orig.get("backlinks", []),
+                "folder": metadata.get("folder_name", ""),
+                "wikilinks": orig.get("wikilinks", ()),
+                "backlinks": orig.get("backlinks", ()),
             }
 
-    # Collect secondary links from graph (wikilinks and backlinks of retrieved notes)
-    secondary_names = set()
-    for info in seen.values():
-        for wl in info["wikilinks"]:
-            secondary_names.add(wl)
-        for bl in info["backlinks"]:
-            secondary_names.add(bl)
-    secondary_names -= set(seen.keys())
-
-    # Split into tags vs notes based on whether the name is in tag_set
+    # One pass over the deduped results: rank them, split into tags vs
+    # notes, and collect the graph neighbours (wikilinks/backlinks) of
+    # each, instead of three separate traversals. nlargest is a heap
+    # selection, cheaper than a full sort once top_k << candidates.
     suggested_tags = []
     suggested_links = []
+    secondary_names: set[str] = set()
 
-    for info in sorted(seen.values(), key=lambda x: x["score"], reverse=True):
+    for info in nlargest(top_k, seen.values(), key=itemgetter("score")):
         if info["title"] in tag_set:
             suggested_tags.append({
                 "title": info["title"],
@@ -100,13 +202,18 @@ def suggest_links_and_tags(
             })
         else:
             suggested_links.append(info)
+        meta = meta_get(info["title"])
+        if meta is not None:
+            secondary_names |= meta["neighbors"]
+    secondary_names.difference_update(seen)
 
-    for name in secondary_names:
-        entry = {"title": name, "source": "graph"}
-        if name in tag_set:
-            suggested_tags.append(entry)
-        else:
-            suggested_links.append(entry)
+    # Partition with C-level set algebra rather than a per-name branch.
+    suggested_tags.extend(
+        {"title": name, "source": "graph"} for name in secondary_names & tag_set
+    )
+    suggested_links.extend(
+        {"title": name, "source": "graph"} for name in secondary_names - tag_set
+    )
 
     return {
         "suggested_links": suggested_links,
@@ -114,7 +221,7 @@ def suggest_links_and_tags(
     }
 
 
-def suggest_tags_via_llm(
+def _tag_prompt(
     note_text: str,
     all_tags: list[str],
     retrieval_tags: list[str],
@@ -122,30 +229,13 @@ def suggest_tags_via_llm(
     tag_context: dict[str, list[str]] | None = None,
     min_tags: int = 3,
     max_tags: int = 6,
-) -> dict:
-    """
-    Use an LLM to select the best tags (Layer 2 fallback)
-
-    Called when retrieval returns too few tags or low confidence scores.
-    Uses GPT to intelligently select from all available tags and can
-    propose new tags if no existing tag covers a key concept.
-
-    Args:
-        note_text: The content of the note to tag.
-        all_tags: List of all available tags in the vault.
-        retrieval_tags: Tags already suggested by retrieval (for context).
-        filename: Original PDF filename (helps identify course context).
-        tag_context: Dict mapping tag name -> list of note titles using it.
-        min_tags: Minimum number of tags to suggest.
-        max_tags: Maximum number of tags to suggest.
-
-    Returns:
-        Dict with 'existing_tags', 'new_tags', and 'reasoning' keys.
-    """
+) -> str:
+    """Build the tag-selection prompt for the LLM fallback."""
+    tags_key = tuple(all_tags)
     # Build tag context string showing what notes use each tag
     if tag_context:
         tag_info_lines = []
-        for tag in sorted(all_tags):
+        for tag in _sorted_tags(tags_key):
             notes = tag_context.get(tag, [])
             if notes:
                 sample = notes[:5]
@@ -155,7 +245,7 @@ def suggest_tags_via_llm(
                 tag_info_lines.append(f"  {tag}: (unused)")
         tag_section = "Available tags (with notes that use them):\n" + "\n".join(tag_info_lines)
     else:
-        tag_section = f"Available tags:\n{json.dumps(sorted(all_tags))}"
+        tag_section = f"Available tags:\n{_tags_blob(tags_key)}"
 
     filename_section = f"\nSource filename: {filename}\n" if filename else ""
 
@@ -170,7 +260,7 @@ Note content:
 {tag_section}
 
 Tags already suggested by retrieval (may or may not be correct):
-{json.dumps(retrieval_tags)}
+{orjson.dumps(retrieval_tags).decode()}
 
 Rules:
 - Select {min_tags} to {max_tags} tags total.
@@ -186,11 +276,188 @@ Return format:
     "new_tags": ["tag3"],
     "reasoning": "brief explanation of choices"
 }}"""
+    return prompt
+
+
+async def suggest_tags_via_llm_async(
+    note_text: str,
+    all_tags: list[str],
+    retrieval_tags: list[str],
+    filename: str = "",
+    tag_context: dict[str, list[str]] | None = None,
+    min_tags: int = 3,
+    max_tags: int = 6,
+    sem: asyncio.Semaphore | None = None,
+) -> dict:
+    """
+    Use an LLM to select the best tags (Layer 2 fallback)
 
-    response = openai.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0,
+    Called when retrieval returns too few tags or low confidence scores.
+    Uses GPT to intelligently select from all available tags and can
+    propose new tags if no existing tag covers a key concept.
+
+    Args:
+        note_text: The content of the note to tag.
+        all_tags: List of all available tags in the vault.
+        retrieval_tags: Tags already suggested by retrieval (for context).
+        filename: Original PDF filename (helps identify course context).
+        tag_context: Dict mapping tag name -> list of note titles using it.
+        min_tags: Minimum number of tags to suggest.
+        max_tags: Maximum number of tags to suggest.
+        sem: Optional semaphore bounding concurrent requests (used by
+            suggest_tags_via_llm_batch to respect rate limits).
+
+    Returns:
+        Dict with 'existing_tags', 'new_tags', and 'reasoning' keys.
+    """
+    # Shares the OCR module's pooled client and background loop, so tag
+    # calls ride the same keep-alive connections as page OCR.
+    from obsrag.ocr.vision import get_async_client
+
+    prompt = _tag_prompt(
+        note_text, all_tags, retrieval_tags,
+        filename=filename, tag_context=tag_context,
+        min_tags=min_tags, max_tags=max_tags,
+    )
+    client = get_async_client()
+
+    async def call():
+        # json_object mode guarantees parseable output (no fence-stripping
+        # or repair pass), and the token cap bounds worst-case latency —
+        # a valid response is a few short lists plus one sentence.
+        response = await client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0,
+            response_format={"type": "json_object"},
+            max_tokens=400,
+        )
+        return orjson.loads(response.choices[0].message.content)
+
+    if sem is not None:
+        async with sem:
+            return await call()
+    return await call()
+
+
+def suggest_tags_via_llm(
+    note_text: str,
+    all_tags: list[str],
+    retrieval_tags: list[str],
+    filename: str = "",
+    tag_context: dict[str, list[str]] | None = None,
+    min_tags: int = 3,
+    max_tags: int = 6,
+) -> dict:
+    """Synchronous wrapper for suggest_tags_via_llm_async."""
+    from obsrag.ocr.vision import run_async
+
+    return run_async(suggest_tags_via_llm_async(
+        note_text, all_tags, retrieval_tags,
+        filename=filename, tag_context=tag_context,
+        min_tags=min_tags, max_tags=max_tags,
+    ))
+
+
+def suggest_tags_via_llm_batch(notes: list[dict], max_concurrency: int = 8) -> list:
+    """Run the LLM tag fallback for several notes concurrently.
+
+    Each entry in notes is a kwargs dict for suggest_tags_via_llm_async.
+    Requests overlap their network latency under a shared semaphore, so a
+    watcher backlog pays roughly one round trip instead of one per note.
+    Failures come back as the exception object in that note's slot rather
+    than aborting the whole batch.
+    """
+    from obsrag.ocr.vision import run_async
+
+    async def run():
+        sem = asyncio.Semaphore(max_concurrency)
+        return await asyncio.gather(
+            *[suggest_tags_via_llm_async(sem=sem, **note) for note in notes],
+            return_exceptions=True,
+        )
+
+    return list(run_async(run()))
+
+
+def suggest_with_fallback(
+    text: str,
+    index,
+    tag_set: set[str],
+    docs: list,
+    cfg,
+    reranker=None,
+    retriever=None,
+    filename: str = "",
+    tag_context: dict[str, list[str]] | None = None,
+    all_tags=None,
+    defer_llm: bool = False,
+) -> dict:
+    """Run Layer 1 retrieval plus the Layer 2 LLM-fallback decision.
+
+    The API's /process route and the CLI pipeline used to duplicate this
+    threshold logic; keeping it here means the fallback criteria can't
+    drift between the two paths.
+
+    Args:
+        all_tags: Pre-sorted tag names for the LLM prompt; falls back to
+            sorting tag_set when not given.
+        defer_llm: Run a triggered fallback on a worker thread instead of
+            blocking; the result then carries an 'llm_tags_future' so the
+            caller can overlap the 1-3s LLM latency with other work. Call
+            resolve_llm_tags(result) before reading 'llm_tags'.
+
+    Returns:
+        The suggest_links_and_tags result dict with an 'llm_tags' key added
+        (None when the fallback didn't trigger).
+    """
+    result = suggest_links_and_tags(
+        text, index, tag_set, docs,
+        reranker=reranker, top_k=cfg.rag.top_k, retriever=retriever,
     )
+    retrieval_tags = [t["title"] for t in result["suggested_tags"]]
+    top_score = result["suggested_links"][0]["score"] if result["suggested_links"] else 0
+
+    result["llm_tags"] = None
+    if len(retrieval_tags) < cfg.rag.min_tags_threshold or top_score < cfg.rag.min_confidence_threshold:
+        logger.info("[LLM fallback triggered: %d tags, top_score=%.2f]", len(retrieval_tags), top_score)
+
+        def run_fallback():
+            return suggest_tags_via_llm(
+                note_text=text,
+                all_tags=all_tags if all_tags is not None else sorted(tag_set),
+                retrieval_tags=retrieval_tags,
+                filename=filename,
+                tag_context=tag_context,
+            )
 
-    return json.loads(response.choices[0].message.content)
+        if defer_llm:
+            result["llm_tags_future"] = _deferred_llm_pool.submit(run_fallback)
+        else:
+            result["llm_tags"] = run_fallback()
+    return result
+
+
+def resolve_llm_tags(result: dict) -> None:
+    """Wait for a deferred LLM fallback, folding it into 'llm_tags'."""
+    future = result.pop("llm_tags_future", None)
+    if future is not None:
+        result["llm_tags"] = future.result()
+
+
+def finalize_suggestions(result: dict) -> tuple[list[str], list[str]]:
+    """Final tag list and reference links from a suggestion result.
+
+    LLM-selected tags win when the fallback ran; otherwise the retrieval
+    tags stand. References are the directly-retrieved links only.
+    """
+    llm_tags = result.get("llm_tags")
+    if llm_tags:
+        final_tags = llm_tags.get("existing_tags", []) + llm_tags.get("new_tags", [])
+    else:
+        final_tags = [t["title"] for t in result["suggested_tags"]]
+    references = [
+        link["title"] for link in result["suggested_links"]
+        if link.get("source") == "retrieval"
+    ]
+    return final_tags, references
@@ -1,7 +1,21 @@
 """Load tag set from the Obsidian vault."""
+import functools
+import logging
+import os
 import re
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+import numpy as np
+
+logger = logging.getLogger("obsrag.rag")
+
+# Regex: # preceded by whitespace or line start, followed by a letter,
+# then letters/digits/hyphens/underscores. Matches Obsidian's tag format.
+_TAG_RE = re.compile(r'(?:^|\s)#([a-zA-Z][a-zA-Z0-9_-]*)')
+# Fenced code blocks, whose contents must not contribute tags.
+_CODE_FENCE_RE = re.compile(r'```.*?```', re.DOTALL)
+
 
 def load_tag_set(vault_path: Path, style: str = "wikilink", tags_folder_name: str = "3 - Tags") -> set[str]:
     """
@@ -15,44 +29,137 @@ def load_tag_set(vault_path: Path, style: str = "wikilink", tags_folder_name: st
 
     Returns:
         Set of tag name strings.
+
+    The scan is memoized on an mtime/count signature of the relevant
+    files, so the repeated calls the watcher and note-writes make are
+    stat-only unless something actually changed. A fresh set is returned
+    each call because callers mutate their tag set in place.
+    """
+    signature = _tag_signature(vault_path, style, tags_folder_name)
+    return set(_load_tag_set_cached(str(vault_path), style, tags_folder_name, signature))
+
+
+def _tag_signature(vault_path: Path, style: str, tags_folder_name: str) -> tuple[int, int]:
+    """(latest mtime_ns, file count) over the files the tag set depends on.
+
+    Changes whenever a relevant file is added, removed, or edited, which
+    makes it a free cache-invalidation key: stale entries are simply never
+    looked up again.
     """
+    latest = 0
+    count = 0
     if style == "hashtag":
-        tags = _scan_hashtags(vault_path)
+        for f in vault_path.rglob("*.md"):
+            count += 1
+            try:
+                mtime = f.stat().st_mtime_ns
+            except OSError:
+                continue
+            if mtime > latest:
+                latest = mtime
     else:
-        tags = _scan_wikilink_tags(vault_path, tags_folder_name)
+        tags_folder = vault_path / tags_folder_name
+        try:
+            entries = os.scandir(tags_folder)
+        except OSError:
+            return (0, 0)
+        # scandir's DirEntry carries the stat from the directory read on
+        # most platforms, so this is one pass with no extra stat calls.
+        with entries:
+            for entry in entries:
+                if not entry.name.endswith(".md"):
+                    continue
+                count += 1
+                try:
+                    mtime = entry.stat().st_mtime_ns
+                except OSError:
+                    continue
+                if mtime > latest:
+                    latest = mtime
+    return (latest, count)
+
+
+@functools.lru_cache(maxsize=4)
+def _load_tag_set_cached(
+    vault_path: str, style: str, tags_folder_name: str, signature: tuple[int, int]
+) -> frozenset[str]:
+    """The actual vault scan, keyed by the files' mtime signature."""
+    if style == "hashtag":
+        tags = _scan_hashtags(Path(vault_path))
+    else:
+        tags = _scan_wikilink_tags(Path(vault_path), tags_folder_name)
 
-    print(f"Loaded {len(tags)} tags from vault ({style} style)")
-    return tags
+    logger.info("Loaded %d tags from vault (%s style)", len(tags), style)
+    return frozenset(tags)
 
 
 def _scan_wikilink_tags(vault_path: Path, tags_folder_name: str) -> set[str]:
-    """Scan the tags folder for .md files — each filename is a tag."""
+    """Scan the tags folder for .md files — each filename is a tag.
+
+    os.scandir with an endswith check and a name slice skips the glob
+    engine's per-entry fnmatch and Path construction, which dominate when
+    the tags folder holds thousands of mostly-empty files.
+    """
     tags_folder = vault_path / tags_folder_name
-    if not tags_folder.exists():
-        print(f"Warning: Tags folder not found at {tags_folder}")
+    try:
+        entries = os.scandir(tags_folder)
+    except OSError:
+        logger.warning("Tags folder not found at %s", tags_folder)
         return set()
-    return {f.stem for f in tags_folder.glob("*.md")}
+    with entries:
+        return {
+            entry.name[:-3]
+            for entry in entries
+            if entry.name.endswith(".md") and entry.is_file(follow_symlinks=False)
+        }
 
 
 def _scan_hashtags(vault_path: Path) -> set[str]:
-    """Scan all vault notes for #hashtag patterns."""
-    # Regex: # preceded by whitespace or line start, followed by a letter,
-    # then letters/digits/hyphens/underscores. Matches Obsidian's tag format.
-    tag_pattern = re.compile(r'(?:^|\s)#([a-zA-Z][a-zA-Z0-9_-]*)')
-    # Pattern to strip fenced code blocks before scanning
-    code_fence_pattern = re.compile(r'```.*?```', re.DOTALL)
+    """Scan all vault notes for #hashtag patterns.
+
+    Reading thousands of small files is I/O-bound, so the per-file work
+    fans out over a thread pool; tag sets are unioned as workers finish.
+    """
+    paths = list(vault_path.rglob("*.md"))
+    tags: set[str] = set()
+    if not paths:
+        return tags
+
+    max_workers = min(32, 4 * (os.cpu_count() or 1))
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for file_tags in pool.map(_scan_hashtag_file, paths):
+            tags |= file_tags
+    return tags
 
-    tags = set()
-    for md_file in vault_path.rglob("*.md"):
-        try:
-            text = md_file.read_text(encoding="utf-8")
-        except (UnicodeDecodeError, OSError):
-            continue
 
-        # Strip code blocks so we don't pick up # in code
-        text = code_fence_pattern.sub("", text)
-        tags.update(tag_pattern.findall(text))
+def _scan_hashtag_file(md_file: Path) -> set[str]:
+    """Hashtags from one markdown file; empty on read errors."""
+    try:
+        text = md_file.read_text(encoding="utf-8")
+    except (UnicodeDecodeError, OSError):
+        return set()
+    return _extract_hashtags(text)
+
 
+def _extract_hashtags(text: str) -> set[str]:
+    """Hashtags in text, ignoring matches inside fenced code blocks.
+
+    Rather than substituting code fences away — which copies the whole
+    file just to mask a few spans — this records the fence intervals and
+    walks the tag matches once, discarding any that fall inside a fence.
+    Both match streams are in document order, so a single span pointer
+    suffices.
+    """
+    fence_spans = [(m.start(), m.end()) for m in _CODE_FENCE_RE.finditer(text)]
+    tags = set()
+    span_idx = 0
+    for match in _TAG_RE.finditer(text):
+        pos = match.start(1)
+        while span_idx < len(fence_spans) and fence_spans[span_idx][1] <= pos:
+            span_idx += 1
+        if span_idx < len(fence_spans) and fence_spans[span_idx][0] <= pos:
+            continue
+        tags.add(match.group(1))
     return tags
 
 
@@ -73,6 +180,31 @@ def refresh_tag_set(
     return tag_set, tag_context
 
 
+class TagEmbeddingIndex:
+    """Dense matrix of tag-name embeddings for vectorized tag scoring.
+
+    Tag names are embedded once (a single batched API call) and stored as an
+    L2-normalized float32 matrix, so scoring every tag against a query is one
+    matrix-vector product instead of a Python loop over tags.
+    """
+
+    def __init__(self, tags: list[str], embed_model):
+        self.tags = list(tags)
+        vectors = embed_model.get_text_embedding_batch(self.tags)
+        matrix = np.asarray(vectors, dtype=np.float32)
+        self.matrix = matrix / (np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-12)
+
+    def top_tags(self, query_vec, k: int = 5) -> list[tuple[str, float]]:
+        """Return the k tags most similar to the query embedding."""
+        q = np.asarray(query_vec, dtype=np.float32)
+        q = q / (np.linalg.norm(q) + 1e-12)
+        scores = self.matrix @ q
+        k = min(k, len(self.tags))
+        top = np.argpartition(scores, -k)[-k:]
+        top = top[np.argsort(scores[top])[::-1]]
+        return [(self.tags[i], float(scores[i])) for i in top]
+
+
 def build_tag_context(docs: list, tag_set: set[str]) -> dict[str, list[str]]:
     """
     Build a mapping of each tag to the note titles that reference it.
@@ -83,16 +215,22 @@ def build_tag_context(docs: list, tag_set: set[str]) -> dict[str, list[str]]:
     Returns:
         Dict mapping tag name -> list of note titles that use it.
     """
-    tag_to_notes: dict[str, set[str]] = {tag: set() for tag in tag_set}
+    # Probe tag_set directly and only materialize entries for tags that
+    # are actually used — no per-doc set unions, no pre-seeded dict over
+    # the whole tag set.
+    tag_to_notes: dict[str, set[str]] = {}
 
     for doc in docs:
         note_name = doc.metadata.get("note_name", "")
         if not note_name:
             continue
-        links = set(doc.metadata.get("wikilinks", [])) | set(doc.metadata.get("backlinks", []))
-        for link in links:
-            if link in tag_to_notes:
-                tag_to_notes[link].add(note_name)
+        metadata = doc.metadata
+        for link in metadata.get("wikilinks", []):
+            if link in tag_set:
+                tag_to_notes.setdefault(link, set()).add(note_name)
+        for link in metadata.get("backlinks", []):
+            if link in tag_set:
+                tag_to_notes.setdefault(link, set()).add(note_name)
 
     # Convert sets to sorted lists
-    return {tag: sorted(notes) for tag, notes in tag_to_notes.items() if notes}
+    return {tag: sorted(notes) for tag, notes in tag_to_notes.items()}
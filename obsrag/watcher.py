@@ -1,22 +1,65 @@
-"""Poll a folder for new PDFs and run the full pipeline on each."""
-import json
+"""Watch a folder for new PDFs and run the full pipeline on each."""
+import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-PROCESSED_LOG = Path(".obsrag/processed.json")
+import orjson
+
+PROCESSED_LOG = Path(".obsrag/processed.jsonl")
+# Pre-JSONL log format, read once for migration then superseded.
+_LEGACY_LOG = Path(".obsrag/processed.json")
 
 
 def load_processed() -> set[str]:
-    """Load the set of already-processed filenames."""
+    """Load the set of already-processed filenames.
+
+    The log is append-only JSONL (one filename per line), so completions
+    are O(1) instead of rewriting the whole set per PDF. Duplicate lines
+    can accumulate across restarts; when they outnumber the distinct
+    names the log is compacted back to one line per name.
+    """
+    processed = set()
+    if _LEGACY_LOG.exists() and not PROCESSED_LOG.exists():
+        processed.update(orjson.loads(_LEGACY_LOG.read_bytes()))
+        # Seed the JSONL so later loads don't depend on the legacy file.
+        _compact_processed(processed)
+
+    lines = 0
     if PROCESSED_LOG.exists():
-        return set(json.loads(PROCESSED_LOG.read_text()))
-    return set()
+        with open(PROCESSED_LOG) as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    lines += 1
+                    processed.add(orjson.loads(line))
 
+    if lines > 2 * len(processed):
+        _compact_processed(processed)
+    return processed
 
-def save_processed(processed: set[str]):
-    """Save the set of processed filenames to disk."""
+
+def append_processed(name: str):
+    """Record one completed filename in the append-only log.
+
+    fsync'd so a crash right after a completion can't lose the entry and
+    re-OCR the whole PDF on restart — one flush per processed file is
+    cheap next to the minutes of work it protects.
+    """
     PROCESSED_LOG.parent.mkdir(parents=True, exist_ok=True)
-    PROCESSED_LOG.write_text(json.dumps(sorted(processed), indent=2))
+    with open(PROCESSED_LOG, "ab") as f:
+        f.write(orjson.dumps(name) + b"\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _compact_processed(processed: set[str]):
+    """Rewrite the log as one line per distinct name (atomic replace)."""
+    PROCESSED_LOG.parent.mkdir(parents=True, exist_ok=True)
+    tmp = PROCESSED_LOG.with_suffix(".tmp")
+    tmp.write_bytes(b"".join(orjson.dumps(name) + b"\n" for name in sorted(processed)))
+    tmp.replace(PROCESSED_LOG)
 
 
 def get_new_pdfs(watch_folder: Path, processed: set[str]) -> list[Path]:
@@ -30,37 +73,122 @@ def get_new_pdfs(watch_folder: Path, processed: set[str]) -> list[Path]:
     ]
 
 
-def watch_loop(process_fn, watch_folder: Path, poll_interval: int = 30):
+def _wait_for_stable_size(pdf_path: Path, settle_seconds: float = 1.0, timeout: float = 60.0):
+    """Block until the file's size stops changing (or it disappears).
+
+    Event-driven watching fires on creation, often before the PDF has
+    finished copying in; processing a half-written file would OCR garbage.
     """
-    Poll watch_folder for new PDFs and run process_fn on each.
+    deadline = time.monotonic() + timeout
+    last_size = -1
+    while time.monotonic() < deadline:
+        try:
+            size = pdf_path.stat().st_size
+        except OSError:
+            return
+        if size == last_size and size > 0:
+            return
+        last_size = size
+        time.sleep(settle_seconds)
+
+
+def watch_loop(process_fn, watch_folder: Path, poll_interval: int = 30, max_concurrent: int = 4):
+    """
+    Watch watch_folder for new PDFs and run process_fn on each.
+
+    Uses OS file-change events (watchdog) when the optional dependency is
+    installed — new PDFs are picked up immediately with zero idle CPU —
+    and falls back to polling every poll_interval seconds otherwise.
+    Either way, PDFs already in the folder at startup are processed first.
+
+    PDFs are dispatched to a bounded worker pool so a backlog dumped into
+    the watch folder is processed max_concurrent at a time — the OCR stage
+    is almost entirely HTTP-bound, so distinct PDFs overlap well, while the
+    bound avoids rate-limit thrash.
 
     Args:
         process_fn: Callable that takes a Path to a PDF and processes it.
+            Must serialize any shared-state mutation itself (process_pdf does).
         watch_folder: Folder to watch for new PDFs.
-        poll_interval: Seconds between polls.
+        poll_interval: Seconds between polls (polling fallback only).
+        max_concurrent: Maximum number of PDFs processed at once.
     """
     processed = load_processed()
-    print(f"Watching {watch_folder} for new PDFs (every {poll_interval}s)...")
+    in_flight: set[str] = set()
+    state_lock = threading.Lock()
+
+    def run_one(pdf_path: Path):
+        _wait_for_stable_size(pdf_path)
+        print(f"\n{'='*50}")
+        print(f"New PDF detected: {pdf_path.name}")
+        print(f"{'='*50}")
+        try:
+            process_fn(pdf_path)
+            with state_lock:
+                processed.add(pdf_path.name)
+                append_processed(pdf_path.name)
+            print(f"Marked {pdf_path.name} as processed.")
+        except Exception as e:
+            print(f"Error processing {pdf_path.name}: {e}")
+        finally:
+            with state_lock:
+                in_flight.discard(pdf_path.name)
+
     print(f"Already processed: {len(processed)} files")
     print("Press Ctrl+C to stop.\n")
 
+    with ThreadPoolExecutor(max_workers=max_concurrent) as pool:
+        def submit(pdf_path: Path):
+            with state_lock:
+                if pdf_path.name in processed or pdf_path.name in in_flight:
+                    return
+                in_flight.add(pdf_path.name)
+            pool.submit(run_one, pdf_path)
+
+        try:
+            # Cold start: pick up anything that arrived while we were down.
+            for pdf_path in get_new_pdfs(watch_folder, processed):
+                submit(pdf_path)
+
+            try:
+                _watch_with_events(submit, watch_folder)
+            except ImportError:
+                _watch_with_polling(submit, watch_folder, processed, poll_interval)
+        except KeyboardInterrupt:
+            print("\nWatcher stopped.")
+
+
+def _watch_with_events(submit, watch_folder: Path):
+    """Event-driven watch via watchdog (inotify/FSEvents under the hood)."""
+    from watchdog.events import PatternMatchingEventHandler
+    from watchdog.observers import Observer
+
+    class _PdfHandler(PatternMatchingEventHandler):
+        def __init__(self):
+            super().__init__(patterns=["*.pdf"], ignore_directories=True)
+
+        def on_created(self, event):
+            submit(Path(event.src_path))
+
+        def on_moved(self, event):
+            submit(Path(event.dest_path))
+
+    observer = Observer()
+    observer.schedule(_PdfHandler(), str(watch_folder))
+    observer.start()
+    print(f"Watching {watch_folder} for new PDFs (file events)...")
     try:
         while True:
-            new_pdfs = get_new_pdfs(watch_folder, processed)
-
-            for pdf_path in new_pdfs:
-                print(f"\n{'='*50}")
-                print(f"New PDF detected: {pdf_path.name}")
-                print(f"{'='*50}")
-
-                try:
-                    process_fn(pdf_path)
-                    processed.add(pdf_path.name)
-                    save_processed(processed)
-                    print(f"Marked {pdf_path.name} as processed.")
-                except Exception as e:
-                    print(f"Error processing {pdf_path.name}: {e}")
-
-            time.sleep(poll_interval)
-    except KeyboardInterrupt:
-        print("\nWatcher stopped.")
+            time.sleep(3600)
+    finally:
+        observer.stop()
+        observer.join()
+
+
+def _watch_with_polling(submit, watch_folder: Path, processed: set[str], poll_interval: int):
+    """Polling fallback when watchdog isn't installed."""
+    print(f"Watching {watch_folder} for new PDFs (every {poll_interval}s)...")
+    while True:
+        for pdf_path in get_new_pdfs(watch_folder, processed):
+            submit(pdf_path)
+        time.sleep(poll_interval)
@@ -1,10 +1,49 @@
 """Write formatted notes to the Obsidian vault inbox."""
+import bisect
+import functools
+import logging
+import os
 import re
 from pathlib import Path
 from datetime import datetime
 
 from PIL import Image
 
+logger = logging.getLogger("obsrag.writer")
+
+# Characters stripped from titles when building attachment filenames.
+_SAFE_TITLE_RE = re.compile(r'[^\w\s-]')
+# [Diagram: ...] marker with optional leading list syntax (- , * , • , whitespace).
+_DIAGRAM_RE = re.compile(r'[ \t]*[-*•]?\s*\[Diagram:\s*([^\]]*)\]')
+# Triple+ blank lines left behind by callout insertion.
+_BLANK_RUN_RE = re.compile(r'\n{3,}')
+
+
+@functools.lru_cache(maxsize=1)
+def _config_defaults() -> tuple[str, Path | None]:
+    """(note template, inbox path) fallbacks, resolved from config once.
+
+    Config is static within a run, so callers that don't pass an explicit
+    template or inbox path shouldn't re-resolve it per note.
+    """
+    from obsrag.config import get_config, DEFAULT_NOTE_TEMPLATE
+    try:
+        cfg = get_config()
+        return cfg.note_template, cfg.inbox_path
+    except (FileNotFoundError, ValueError):
+        return DEFAULT_NOTE_TEMPLATE, None
+
+
+@functools.lru_cache(maxsize=16)
+def _ensure_dir(path: Path):
+    """mkdir -p, once per directory per process.
+
+    mkdir(parents=True, exist_ok=True) stat-walks the whole parent chain
+    on every call; under a watcher burst that's per-note filesystem noise
+    for a directory that existed after the first note.
+    """
+    path.mkdir(parents=True, exist_ok=True)
+
 
 def write_note(
     title: str,
@@ -49,23 +88,20 @@ def write_note(
     if page_images and page_offsets and attachments_path:
         content = _embed_diagrams(content, title, page_images, page_offsets, attachments_path)
 
-    # Format tags based on style
+    # Format tags based on style. List comprehensions (not genexprs) let
+    # join presize its result, and plain concatenation beats f-string
+    # formatting for these two-part interpolations.
     if tag_style == "hashtag":
-        tags_str = ", ".join(f"#{tag}" for tag in tags) if tags else ""
+        tags_str = ", ".join(["#" + tag for tag in tags]) if tags else ""
     else:
-        tags_str = ", ".join(f"[[{tag}]]" for tag in tags) if tags else ""
+        tags_str = ", ".join(["[[" + tag + "]]" for tag in tags]) if tags else ""
 
     # Format references as wikilinks
-    refs_str = "\n".join(f"- [[{ref}]]" for ref in references) if references else ""
+    refs_str = "\n".join(["- [[" + ref + "]]" for ref in references]) if references else ""
 
-    # Use default template if none provided
+    # Use cached config defaults when template/inbox aren't given
     if template is None:
-        from obsrag.config import get_config, DEFAULT_NOTE_TEMPLATE
-        try:
-            cfg = get_config()
-            template = cfg.note_template
-        except (FileNotFoundError, ValueError):
-            template = DEFAULT_NOTE_TEMPLATE
+        template, _ = _config_defaults()
 
     note = template.format(
         date=date_str,
@@ -78,24 +114,34 @@ def write_note(
 
     # Determine inbox path
     if inbox_path is None:
-        from obsrag.config import get_config
-        cfg = get_config()
-        inbox_path = cfg.inbox_path
+        _, inbox_path = _config_defaults()
+        if inbox_path is None:
+            raise FileNotFoundError(
+                "No inbox_path given and no .obsrag.yaml found to derive one."
+            )
 
-    inbox_path.mkdir(parents=True, exist_ok=True)
+    _ensure_dir(inbox_path)
     file_path = inbox_path / f"{title}.md"
-    file_path.write_text(note)
-    print(f"Note written to {file_path}")
+    # One open/write/close round trip instead of Path.write_text's
+    # buffered-IO wrapper stack.
+    fd = os.open(str(file_path), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.write(fd, note.encode("utf-8"))
+    finally:
+        os.close(fd)
+    logger.info("Note written to %s", file_path)
 
     return file_path
 
 
-def _find_page_for_position(pos: int, page_offsets: list[tuple[int, int]]) -> int:
-    """Map a character position to a page index using pre-computed offsets."""
-    for i, (start, end) in enumerate(page_offsets):
-        if start <= pos <= end:
-            return i
-    return len(page_offsets) - 1
+def _find_page_for_position(pos: int, page_starts: list[int]) -> int:
+    """Map a character position to a page index.
+
+    page_starts is sorted, so this is a binary search rather than a linear
+    scan over every page per diagram marker.
+    """
+    idx = bisect.bisect_right(page_starts, pos) - 1
+    return max(0, idx)
 
 
 def _embed_diagrams(
@@ -106,35 +152,37 @@ def _embed_diagrams(
     attachments_path: Path,
 ) -> str:
     """Replace [Diagram: ...] markers with collapsed Obsidian callouts containing page images."""
-    attachments_path.mkdir(parents=True, exist_ok=True)
+    _ensure_dir(attachments_path)
 
     # Sanitize title for use in filenames
-    safe_title = re.sub(r'[^\w\s-]', '', title).strip().replace(' ', '_')
+    safe_title = _SAFE_TITLE_RE.sub('', title).strip().replace(' ', '_')
 
     # Track which pages have already been saved to avoid duplicates
     saved_pages: dict[int, str] = {}  # page_idx -> img_name
 
-    # Match marker with optional leading list syntax (- , * , • , whitespace)
-    pattern = re.compile(r'[ \t]*[-*•]?\s*\[Diagram:\s*([^\]]*)\]')
+    page_starts = [start for start, _ in page_offsets]
 
     def replace_match(match):
         description = match.group(1).strip() or "diagram"
-        page_idx = _find_page_for_position(match.start(), page_offsets)
+        page_idx = _find_page_for_position(match.start(), page_starts)
 
         # Save page image once per page
         if page_idx not in saved_pages:
             img_name = f"{safe_title}_page_{page_idx + 1}.png"
             img_path = attachments_path / img_name
-            page_images[page_idx].save(img_path, format="PNG")
+            # Low zlib effort: these are line-art page renders, where the
+            # heavier compression levels cost 5-10x the CPU for a few
+            # percent smaller files.
+            page_images[page_idx].save(img_path, format="PNG", compress_level=1)
             saved_pages[page_idx] = img_name
-            print(f"  Saved page image: {img_path}")
+            logger.info("  Saved page image: %s", img_path)
 
         img_name = saved_pages[page_idx]
         # Surround with blank lines so the callout is never nested inside a list.
         # Both lines need > prefix for Obsidian to treat the image as part of the callout.
         return f"\n\n> [!info]- Original page (diagram: {description})\n> ![[{img_name}]]\n\n"
 
-    result = pattern.sub(replace_match, content)
+    result = _DIAGRAM_RE.sub(replace_match, content)
     # Collapse triple+ blank lines left by the insertion
-    result = re.sub(r'\n{3,}', '\n\n', result)
+    result = _BLANK_RUN_RE.sub('\n\n', result)
     return result